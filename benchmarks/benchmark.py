@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Headless benchmark of the annotation index, driven by a fake annotation
+# manager emitting the same signals as QgsAnnotationManager.
+#
+#   python benchmarks/benchmark.py [--sizes 1000 10000 100000] [--repeat 3]
+
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import time
+
+# Loads the plugin as the annotationManager package without QGIS: its
+# __init__ only imports the QGIS dependent modules from classFactory.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location('annotationManager', os.path.join(ROOT, '__init__.py'), submodule_search_locations=[ROOT])
+sys.modules['annotationManager'] = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sys.modules['annotationManager'])
+
+from annotationManager.core import AnnotationIndex, IndexListener
+
+WORDS = ['survey', 'point', 'draft', 'bridge', 'river', 'road', 'house', 'church', 'well', 'field', 'forest', 'note']
+
+class FakeSignal:
+
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot):
+        self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+class FakeAnnotation:
+
+    def __init__(self, text, x, y):
+        self.text = text
+        self.x = x
+        self.y = y
+        self.visible = True
+        self.appearanceChanged = FakeSignal()
+        self.moved = FakeSignal()
+
+    def isVisible(self):
+        return self.visible
+
+    def setVisible(self, visible):
+        if self.visible != visible:
+            self.visible = visible
+            self.appearanceChanged.emit()
+
+    def setMapPosition(self, x, y):
+        self.x = x
+        self.y = y
+        self.moved.emit()
+
+class FakeAnnotationManager:
+
+    def __init__(self):
+        self.items = []
+        self.annotationAdded = FakeSignal()
+        self.annotationAboutToBeRemoved = FakeSignal()
+        self.annotationRemoved = FakeSignal()
+
+    def annotations(self):
+        return list(self.items)
+
+    def addAnnotation(self, annotation):
+        self.items.append(annotation)
+        self.annotationAdded.emit(annotation)
+
+    def removeAnnotation(self, annotation):
+        self.annotationAboutToBeRemoved.emit(annotation)
+        self.items.remove(annotation)
+        self.annotationRemoved.emit()
+
+    def removeAnnotations(self, annotations):
+        # Same signals as removeAnnotation without the list.remove() cost,
+        # which belongs to the manager and not to the index.
+        annotations = set(annotations)
+        for annotation in annotations:
+            self.annotationAboutToBeRemoved.emit(annotation)
+        self.items = [annotation for annotation in self.items if annotation not in annotations]
+        for annotation in annotations:
+            self.annotationRemoved.emit()
+
+class CountingListener(IndexListener):
+
+    def __init__(self):
+        self.notifications = 0
+
+    def __getattribute__(self, name):
+        if name.startswith('index'):
+            object.__setattr__(self, 'notifications', object.__getattribute__(self, 'notifications')+1)
+        return object.__getattribute__(self, name)
+
+def fakeAnnotations(count, rng):
+    return [FakeAnnotation(' '.join(rng.choice(WORDS) for _ in range(6))+' {}'.format(i), rng.uniform(0, 1000), rng.uniform(0, 1000)) for i in range(count)]
+
+def fakeTitle(annotation):
+    return annotation.text.split('\n')[0][:40]
+
+def fakeText(annotation):
+    return annotation.text
+
+def fakePosition(annotation):
+    return annotation.x, annotation.y
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter()-start
+
+def run(size, seed=0):
+    rng = random.Random(seed)
+    manager = FakeAnnotationManager()
+    index = AnnotationIndex(manager, fakeTitle, fakeText)
+    index.setPositionFunction(fakePosition)
+    listener = CountingListener()
+    index.listeners.append(listener)
+    annotations = fakeAnnotations(size, rng)
+    results = {}
+
+    def load():
+        with index.batch():
+            for annotation in annotations:
+                manager.addAnnotation(annotation)
+    results['load'] = timed(load)
+    results['resync'] = timed(index.resync)
+    results['titles'] = timed(lambda: [index.title(index.annotation(row)) for row in range(min(size, 50))])
+    results['hide all'] = timed(lambda: index.setVisibility(index.annotations(), False))
+    results['show all'] = timed(lambda: index.setVisibility(index.annotations(), True))
+
+    selection = sorted(rng.sample(range(size), size//10))
+
+    annotations[0].appearanceChanged.emit()
+    results['edit one'] = timed(annotations[1].appearanceChanged.emit)
+    results['text index'] = timed(lambda: index.search('dra'))
+    results['search'] = timed(lambda: index.search('survey dra'))
+    results['spatial index'] = timed(lambda: index.annotationsIn(0, 0, 1, 1))
+    results['view query'] = timed(lambda: index.annotationsIn(400, 400, 600, 600))
+
+    # The same query on a spatial index built while the project was empty,
+    # then filled by imports of 1000 annotations.
+    grown = AnnotationIndex(FakeAnnotationManager(), fakeTitle, fakeText)
+    grown.setPositionFunction(fakePosition)
+    grown.buildSpatialIndex()
+    imported = fakeAnnotations(size, random.Random(seed))
+    for start in range(0, size, 1000):
+        with grown.batch():
+            for annotation in imported[start:start+1000]:
+                grown.annotationManager.addAnnotation(annotation)
+    results['grown query'] = timed(lambda: grown.annotationsIn(400, 400, 600, 600))
+
+    def select():
+        # Like the highlight and the select tool: selected rows to annotations
+        # to their positions in the spatial index, skipping the rows pending
+        # removal.
+        annotations = [annotation for annotation in map(index.annotation, selection) if annotation is not None]
+        return [index.positionOf(annotation) for annotation in annotations]
+    results['select 10%'] = timed(select)
+
+    def reload():
+        # Reading the project again: every annotation is replaced by a copy
+        # getting the identifier saved in the project.
+        identifiers = index.identifiers()
+        copies = [FakeAnnotation(annotation.text, annotation.x, annotation.y) for annotation in manager.annotations()]
+        with index.batch():
+            manager.removeAnnotations(manager.annotations())
+            for annotation in copies:
+                manager.addAnnotation(annotation)
+            index.assignIdentifiers(identifiers)
+    results['reload'] = timed(reload)
+
+    trash = [index.annotation(row) for row in selection]
+    def remove():
+        with index.batch():
+            manager.removeAnnotations(trash)
+    results['remove 10%'] = timed(remove)
+    results['notifications'] = listener.notifications
+    results['connections'] = index.connectionCount()
+    assert len(index) == size-len(trash)
+    assert index.connectionCount() == 2*len(index)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of the annotation index')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3, help='keep the best of REPEAT runs')
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        runs = [run(size, seed) for seed in range(args.repeat)]
+        rows.append((size, {key: min(r[key] for r in runs) for key in runs[0]}))
+    keys = list(rows[0][1])
+    print('{:<15}'.format('') + ''.join('{:>12}'.format(size) for size, _ in rows))
+    for key in keys:
+        cells = []
+        for _, results in rows:
+            value = results[key]
+            cells.append('{:>12}'.format(value if isinstance(value, int) else '{:.2f} ms'.format(value*1000)))
+        print('{:<15}'.format(key) + ''.join(cells))
+
+if __name__ == '__main__':
+    main()
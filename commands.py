@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtWidgets import QUndoCommand
+
+class RemoveAnnotationsCommand(QUndoCommand):
+
+    # The annotation manager deletes the annotations it removes, so the
+    # command keeps clones of them to be able to add them back, with their
+    # identifiers for the visibility presets to still apply to them.
+    def __init__(self, annotationIndex, annotations, text):
+        super().__init__(text)
+        self.annotationIndex = annotationIndex
+        self.annotations = list(annotations)
+        self.identifiers = [annotationIndex.identifier(annotation) for annotation in self.annotations]
+        self.clones = [annotation.clone() for annotation in self.annotations]
+
+    def redo(self):
+        annotationManager = self.annotationIndex.annotationManager
+        present = set(annotationManager.annotations())
+        with self.annotationIndex.batch():
+            for annotation in self.annotations:
+                if annotation in present:
+                    annotationManager.removeAnnotation(annotation)
+        self.annotations = []
+
+    def undo(self):
+        self.annotations = [clone.clone() for clone in self.clones]
+        with self.annotationIndex.batch():
+            for annotation in self.annotations:
+                self.annotationIndex.annotationManager.addAnnotation(annotation)
+            self.annotationIndex.setIdentifiers(self.annotations, self.identifiers)
@@ -0,0 +1,798 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# This module must not import Qt nor QGIS: it only relies on the annotations
+# being hashable and duck typed like QgsAnnotation, so that it can be used
+# outside of a running QGIS.
+
+import math
+import re
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import partial
+
+from .instrumentation import instrumented, profiler
+
+# Number of characters of the text shown in the tooltips.
+SNIPPET = 200
+
+def contiguousRanges(rows):
+    ranges = []
+    for row in sorted(rows):
+        if ranges and ranges[-1][1] == row-1:
+            ranges[-1][1] = row
+        else:
+            ranges.append([row, row])
+    return [tuple(r) for r in ranges]
+
+def encodeIdentifiers(identifiers):
+    # Bitset of the identifiers, as an hexadecimal string.
+    identifiers = list(identifiers)
+    bits = bytearray((max(identifiers)>>3)+1 if identifiers else 0)
+    for identifier in identifiers:
+        bits[identifier>>3] |= 1 << (identifier & 7)
+    return bits.hex()
+
+def decodeIdentifiers(text):
+    return {(byte<<3)+bit for byte, value in enumerate(bytes.fromhex(text)) if value for bit in range(8) if value >> bit & 1}
+
+def tokenize(text):
+    return set(re.findall(r'\w+', text.casefold()))
+
+class AnnotationIndex:
+
+    # Mirror of a QgsAnnotationManager: keeps the annotations in the manager's
+    # order with an annotation <-> row index, coalesces the manager's signals
+    # into batched row updates and holds the titles, text and spatial indexes.
+    #
+    # Row updates are reported to the listeners through the index* methods
+    # (see IndexListener). schedule(callback) must run callback at the next
+    # event loop tick; without it the pending changes are only applied by an
+    # explicit flush() or at the end of a batch(), and the titles are computed
+    # as soon as they are requested.
+    #
+    # fingerprint(annotation) is a cheap summary of what the title depends on,
+    # used to keep the cached title when an annotation is replaced by another
+    # one with the same identifier (see replaceAnnotations()).
+    def __init__(self, annotationManager=None, title=str, text=None, schedule=None, maxTitles=4096, titleBudget=0.01, fingerprint=None):
+        self.order = []
+        self.rows = {}
+        self.ids = {}
+        self.annotationsById = {}
+        self.nextId = 0
+        self.listeners = []
+        self.pendingAdds = {}
+        self.pendingRemovals = set()
+        self.batchDepth = 0
+        self.flushScheduled = False
+        self.muted = False
+        self.schedule = schedule
+        self.titles = TitleCache(title, maxTitles)
+        self.text = text or (lambda annotation: '')
+        self.snippets = TitleCache(lambda annotation: self.text(annotation)[:SNIPPET], maxTitles)
+        self.titleRequests = OrderedDict()
+        self.titlesScheduled = False
+        self.titleBudget = titleBudget
+        self.fingerprint = fingerprint
+        self.tombstones = {}
+        self.textIndex = None
+        self.position = None
+        self.spatialIndex = None
+        self.unplaced = set()
+        self.subscriptions = SubscriptionRegistry({'appearanceChanged': self.annotationAppearanceChanged, 'moved': self.annotationMoved})
+        self.annotationManager = None
+        if annotationManager is not None:
+            self.attach(annotationManager)
+
+    def attach(self, annotationManager):
+        self.annotationManager = annotationManager
+        annotationManager.annotationAdded.connect(self.annotationAdded)
+        annotationManager.annotationAboutToBeRemoved.connect(self.annotationAboutToBeRemoved)
+
+    def detach(self):
+        self.subscriptions.clear()
+        self.annotationManager.annotationAdded.disconnect(self.annotationAdded)
+        self.annotationManager.annotationAboutToBeRemoved.disconnect(self.annotationAboutToBeRemoved)
+        self.annotationManager = None
+
+    def notify(self, method, *args):
+        for listener in self.listeners:
+            getattr(listener, method)(*args)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __contains__(self, annotation):
+        return annotation in self.rows
+
+    def annotation(self, row):
+        # None for the rows of annotations about to be removed, which must
+        # not be used anymore.
+        annotation = self.order[row]
+        if annotation in self.pendingRemovals:
+            return None
+        return annotation
+
+    def row(self, annotation):
+        return self.rows.get(annotation)
+
+    def annotations(self):
+        return [annotation for annotation in self.order if annotation not in self.pendingRemovals]
+
+    def reset(self, annotations=()):
+        annotations = list(annotations)
+        for annotation in set(self.order).difference(annotations):
+            self.forget(annotation)
+        self.order = annotations
+        self.rows = {annotation: row for row, annotation in enumerate(self.order)}
+        for annotation in self.order:
+            self.identifier(annotation)
+
+    def append(self, annotations):
+        for annotation in annotations:
+            self.rows[annotation] = len(self.order)
+            self.order.append(annotation)
+            self.identifier(annotation)
+
+    def removeRows(self, start, end):
+        for annotation in self.order[start:end+1]:
+            del self.rows[annotation]
+            self.forget(annotation)
+        del self.order[start:end+1]
+        for row in range(start, len(self.order)):
+            self.rows[self.order[row]] = row
+
+    def removeAnnotations(self, annotations):
+        annotations = set(annotations)
+        self.reset(annotation for annotation in self.order if annotation not in annotations)
+
+    def identifier(self, annotation):
+        # Stable identifier of the annotation, persisted in the project in the
+        # manager's order (see identifiers() and assignIdentifiers()).
+        identifier = self.ids.get(annotation)
+        if identifier is None:
+            identifier = self.ids[annotation] = self.nextId
+            self.annotationsById[identifier] = annotation
+            self.nextId += 1
+        return identifier
+
+    def annotationByIdentifier(self, identifier):
+        return self.annotationsById.get(identifier)
+
+    def forget(self, annotation):
+        identifier = self.ids.pop(annotation, None)
+        if self.annotationsById.get(identifier) is annotation:
+            del self.annotationsById[identifier]
+
+    def identifiers(self):
+        return [self.identifier(annotation) for annotation in self.annotationManager.annotations()]
+
+    def assignIdentifiers(self, identifiers, nextId=0):
+        # Restores the identifiers saved by identifiers(), ignored if the
+        # annotations do not match them anymore. nextId is the saved one, so
+        # that the identifiers of the removed annotations are not reused.
+        annotations = self.annotationManager.annotations()
+        if len(annotations) != len(identifiers) or len(set(identifiers)) != len(identifiers):
+            return False
+        self.setIdentifiers(annotations, identifiers)
+        self.nextId = max(self.nextId, nextId, max(identifiers, default=-1)+1)
+        return True
+
+    def setIdentifiers(self, annotations, identifiers):
+        for annotation, identifier in zip(annotations, identifiers):
+            self.forget(annotation)
+            other = self.annotationsById.get(identifier)
+            if other is not None and other not in self.pendingRemovals:
+                self.forget(other)
+            self.ids[annotation] = identifier
+            self.annotationsById[identifier] = annotation
+
+    def visibilityPreset(self):
+        # The identifiers above the last one are not part of the preset and
+        # are left untouched when applying it.
+        visible = (self.identifier(annotation) for annotation in self.annotations() if annotation.isVisible())
+        return '{}:{}'.format(self.nextId-1, encodeIdentifiers(visible))
+
+    def presetChanges(self, preset):
+        # Returns the annotations to show and to hide to apply preset.
+        lastId, bits = preset.split(':')
+        lastId = int(lastId)
+        visible = decodeIdentifiers(bits)
+        show, hide = [], []
+        for annotation in self.annotations():
+            identifier = self.identifier(annotation)
+            if identifier <= lastId and (identifier in visible) != annotation.isVisible():
+                (show if identifier in visible else hide).append(annotation)
+        return show, hide
+
+    def applyPreset(self, preset):
+        show, hide = self.presetChanges(preset)
+        self.notify('indexVisibilityChosen', show, True)
+        self.notify('indexVisibilityChosen', hide, False)
+        self.toggleVisibility(show+hide)
+        return show, hide
+
+    def annotationAdded(self, annotation):
+        self.pendingAdds[annotation] = None
+        self.scheduleFlush()
+
+    def annotationAboutToBeRemoved(self, annotation):
+        if annotation in self.pendingAdds:
+            del self.pendingAdds[annotation]
+        elif annotation in self.rows:
+            self.pendingRemovals.add(annotation)
+            title = self.titles.pop(annotation)
+            if title is not None and self.fingerprint is not None:
+                self.tombstones[annotation] = (self.fingerprint(annotation), title, self.snippets.pop(annotation))
+            self.snippets.invalidate(annotation)
+            self.subscriptions.unsubscribe(annotation)
+            if self.textIndex is not None:
+                self.textIndex.remove(annotation)
+            if self.spatialIndex is not None:
+                self.spatialIndex.remove(annotation)
+                self.unplaced.discard(annotation)
+        self.scheduleFlush()
+
+    def scheduleFlush(self):
+        if self.batchDepth == 0 and not self.flushScheduled and self.schedule is not None:
+            self.flushScheduled = True
+            self.schedule(self.flush)
+
+    @contextmanager
+    def batch(self):
+        self.batchDepth += 1
+        try:
+            yield self
+        finally:
+            self.batchDepth -= 1
+            if self.batchDepth == 0:
+                self.flush()
+
+    def flush(self):
+        self.flushScheduled = False
+        if self.batchDepth > 0 or not (self.pendingAdds or self.pendingRemovals):
+            return
+        self.replaceAnnotations()
+        self.tombstones = {}
+        ranges = contiguousRanges(self.row(annotation) for annotation in self.pendingRemovals)
+        added = list(self.pendingAdds)
+        self.pendingAdds = {}
+        if len(ranges) > 32:
+            self.notify('indexAboutToBeReset')
+            self.removeAnnotations(self.pendingRemovals)
+            self.pendingRemovals = set()
+            self.appendAnnotations(added)
+            self.notify('indexReset')
+        else:
+            for start, end in reversed(ranges):
+                self.notify('indexRowsAboutToBeRemoved', start, end)
+                self.removeRows(start, end)
+                self.notify('indexRowsRemoved', start, end)
+            self.pendingRemovals = set()
+            if added:
+                row = len(self.order)
+                self.notify('indexRowsAboutToBeInserted', row, row+len(added)-1)
+                self.appendAnnotations(added)
+                self.notify('indexRowsInserted', row, row+len(added)-1)
+        if self.textIndex is not None:
+            self.notify('indexTextChanged')
+        if self.spatialIndex is not None:
+            self.notify('indexPositionsChanged')
+
+    def replaceAnnotations(self):
+        # A removed annotation whose identifier was given to an added one, as
+        # when the project is read again, is replaced in place so that its row
+        # and cached data are kept.
+        replaced = []
+        for old in self.pendingRemovals:
+            new = self.annotationsById.get(self.ids.get(old))
+            if new is not None and new is not old and new in self.pendingAdds:
+                replaced.append((old, new))
+        if not replaced:
+            return
+        rows = []
+        for old, new in replaced:
+            row = self.rows.pop(old)
+            self.order[row] = new
+            self.rows[new] = row
+            rows.append(row)
+            self.pendingRemovals.discard(old)
+            del self.pendingAdds[new]
+            del self.ids[old]
+            tombstone = self.tombstones.get(old)
+            if tombstone is not None and tombstone[0] == self.fingerprint(new):
+                self.titles.put(new, tombstone[1])
+                if tombstone[2] is not None:
+                    self.snippets.put(new, tombstone[2])
+            self.subscriptions.subscribe(new)
+            if self.textIndex is not None:
+                self.textIndex.add(new)
+            if self.spatialIndex is not None:
+                self.indexPosition(new)
+        self.notify('indexAnnotationsReplaced', replaced)
+        for start, end in contiguousRanges(rows):
+            self.notify('indexRowsChanged', start, end, True)
+
+    def appendAnnotations(self, annotations):
+        self.append(annotations)
+        self.indexAnnotations(annotations)
+
+    def indexAnnotations(self, annotations):
+        for annotation in annotations:
+            self.subscriptions.subscribe(annotation)
+            if self.textIndex is not None:
+                self.textIndex.add(annotation)
+            if self.spatialIndex is not None:
+                self.indexPosition(annotation)
+
+    def resync(self):
+        self.notify('indexAboutToBeReset')
+        self.pendingAdds = {}
+        self.pendingRemovals = set()
+        self.tombstones = {}
+        annotations = self.annotationManager.annotations()
+        # Only the identifiers of the annotations which are gone are forgotten.
+        self.reset(annotations)
+        self.titles.clear()
+        self.snippets.clear()
+        self.titleRequests.clear()
+        self.textIndex = None
+        self.spatialIndex = None
+        self.subscriptions.retain(annotations)
+        self.indexAnnotations(annotations)
+        self.notify('indexReset')
+
+    def connectionCount(self):
+        return self.subscriptions.connectionCount()
+
+    def title(self, annotation):
+        return self.titles.get(annotation)
+
+    def cachedTitle(self, annotation):
+        # Title of annotation, or None until processTitles() computed it.
+        return self.cached(self.titles, annotation)
+
+    def cachedSnippet(self, annotation):
+        return self.cached(self.snippets, annotation)
+
+    def cached(self, cache, annotation):
+        if self.schedule is None:
+            return cache.get(annotation)
+        value = cache.peek(annotation)
+        if value is None:
+            self.titleRequests[annotation] = None
+            if not self.titlesScheduled:
+                self.titlesScheduled = True
+                self.schedule(self.processTitles)
+        return value
+
+    @instrumented('processTitles')
+    def processTitles(self):
+        # Computes the requested titles and snippets for at most titleBudget
+        # seconds and schedules the rest for the next tick, as reading the
+        # documents has to happen on the GUI thread.
+        self.titlesScheduled = False
+        deadline = time.perf_counter()+self.titleBudget
+        rows = []
+        while self.titleRequests and time.perf_counter() < deadline:
+            annotation = self.titleRequests.popitem(last=False)[0]
+            row = self.row(annotation)
+            if row is None or annotation in self.pendingRemovals:
+                continue
+            self.titles.get(annotation)
+            self.snippets.get(annotation)
+            rows.append(row)
+        profiler.processed(len(rows))
+        for start, end in contiguousRanges(rows):
+            self.notify('indexTitlesChanged', start, end)
+        if self.titleRequests and self.schedule is not None:
+            self.titlesScheduled = True
+            self.schedule(self.processTitles)
+
+    def annotationAppearanceChanged(self, annotation):
+        # Not instrumented, for the diagnostics to only count the refreshes
+        # which are not muted.
+        if not self.muted:
+            self.refreshAnnotationTitle(annotation)
+
+    @instrumented('refreshAnnotationTitle')
+    def refreshAnnotationTitle(self, annotation):
+        profiler.processed(1)
+        row = self.row(annotation)
+        if row is None or annotation in self.pendingRemovals:
+            return
+        self.titles.invalidate(annotation)
+        self.snippets.invalidate(annotation)
+        if self.textIndex is not None:
+            self.textIndex.invalidate(annotation)
+            self.notify('indexTextChanged')
+        self.notify('indexRowsChanged', row, row, True)
+
+    def setVisible(self, annotation, visible):
+        return self.setVisibility([annotation], visible)
+
+    def setVisibility(self, annotations, visible):
+        # The visibility chosen by the user, as opposed to toggleVisibility()
+        # which is also used to hide annotations temporarily.
+        annotations = [annotation for annotation in annotations if annotation not in self.pendingRemovals]
+        self.notify('indexVisibilityChosen', annotations, visible)
+        changed = [annotation for annotation in annotations if annotation.isVisible() != visible]
+        self.toggleVisibility(changed)
+        return changed
+
+    def toggleVisibility(self, annotations):
+        if not annotations:
+            return
+        # The annotations still emit appearanceChanged, the canvas items rely
+        # on it and Qt merges their repaints; only the per annotation title
+        # refresh is skipped.
+        self.muted = True
+        try:
+            for annotation in annotations:
+                annotation.setVisible(not annotation.isVisible())
+        finally:
+            self.muted = False
+        rows = [row for row in map(self.row, annotations) if row is not None]
+        if rows:
+            self.notify('indexRowsChanged', min(rows), max(rows), False)
+
+    def search(self, query):
+        if not query.strip():
+            return None
+        if self.textIndex is None:
+            self.textIndex = TextIndex(self.text)
+            for annotation in self.annotations():
+                self.textIndex.add(annotation)
+        return self.textIndex.search(query)
+
+    def setPositionFunction(self, position):
+        # position(annotation) returns the (x, y) coordinates of the
+        # annotation, None if it is not bound to a map position.
+        self.position = position
+        self.spatialIndex = None
+        self.notify('indexPositionsChanged')
+
+    def indexPosition(self, annotation):
+        point = self.position(annotation)
+        if point is None:
+            self.spatialIndex.remove(annotation)
+            self.unplaced.add(annotation)
+        else:
+            self.spatialIndex.insert(annotation, *point)
+            self.unplaced.discard(annotation)
+
+    def buildSpatialIndex(self):
+        if self.spatialIndex is None:
+            self.spatialIndex = GridIndex()
+            points = [(annotation, self.position(annotation)) for annotation in self.annotations()]
+            self.spatialIndex.build((annotation, point[0], point[1]) for annotation, point in points if point is not None)
+            self.unplaced = {annotation for annotation, point in points if point is None}
+        return self.spatialIndex
+
+    def annotationsIn(self, xmin, ymin, xmax, ymax):
+        return self.buildSpatialIndex().query(xmin, ymin, xmax, ymax)
+
+    def positionOf(self, annotation):
+        return self.buildSpatialIndex().points.get(annotation)
+
+    def annotationsWithoutPosition(self):
+        self.buildSpatialIndex()
+        return self.unplaced
+
+    def hasMapPosition(self, annotation):
+        return self.spatialIndex is None or annotation in self.spatialIndex
+
+    def annotationMoved(self, annotation):
+        if self.spatialIndex is not None and annotation not in self.pendingRemovals and annotation in self.rows:
+            self.indexPosition(annotation)
+            self.notify('indexPositionsChanged')
+
+class IndexListener:
+
+    # Notifications sent by an AnnotationIndex to its listeners, rows being
+    # inclusive ranges.
+    def indexRowsAboutToBeInserted(self, start, end):
+        pass
+
+    def indexRowsInserted(self, start, end):
+        pass
+
+    def indexRowsAboutToBeRemoved(self, start, end):
+        pass
+
+    def indexRowsRemoved(self, start, end):
+        pass
+
+    def indexAboutToBeReset(self):
+        pass
+
+    def indexReset(self):
+        pass
+
+    def indexRowsChanged(self, first, last, titleChanged):
+        pass
+
+    def indexTitlesChanged(self, first, last):
+        # Only the cached titles of the rows were computed.
+        pass
+
+    def indexVisibilityChosen(self, annotations, visible):
+        # The user is about to set the visibility of annotations, before
+        # the ones which do not have it yet are toggled.
+        pass
+
+    def indexAnnotationsReplaced(self, replaced):
+        # replaced is a list of (old, new) annotations, new is at old's row.
+        pass
+
+    def indexTextChanged(self):
+        pass
+
+    def indexPositionsChanged(self):
+        pass
+
+class SubscriptionRegistry:
+
+    # Connects each annotation's signals exactly once, the callbacks receiving
+    # the annotation as first argument.
+    def __init__(self, callbacks):
+        self.callbacks = callbacks
+        self.subscriptions = {}
+
+    def __contains__(self, annotation):
+        return annotation in self.subscriptions
+
+    def subscribe(self, annotation):
+        if annotation in self.subscriptions:
+            return False
+        slots = []
+        for signal, callback in self.callbacks.items():
+            slot = partial(callback, annotation)
+            getattr(annotation, signal).connect(slot)
+            slots.append((signal, slot))
+        self.subscriptions[annotation] = slots
+        return True
+
+    def unsubscribe(self, annotation, disconnect=True):
+        slots = self.subscriptions.pop(annotation, None)
+        if slots is None:
+            return False
+        if disconnect:
+            for signal, slot in slots:
+                getattr(annotation, signal).disconnect(slot)
+        return True
+
+    def retain(self, annotations):
+        # Forgets the annotations that are not part of annotations anymore;
+        # those have been deleted along with their connections.
+        annotations = set(annotations)
+        for annotation in [a for a in self.subscriptions if a not in annotations]:
+            self.unsubscribe(annotation, disconnect=False)
+
+    def clear(self):
+        for annotation in list(self.subscriptions):
+            self.unsubscribe(annotation)
+
+    def connectionCount(self):
+        return sum(len(slots) for slots in self.subscriptions.values())
+
+class TitleCache:
+
+    # Least recently used cache of the titles computed by title(annotation).
+    def __init__(self, title, maxSize=4096):
+        self.title = title
+        self.maxSize = maxSize
+        self.titles = OrderedDict()
+
+    def __len__(self):
+        return len(self.titles)
+
+    def get(self, annotation):
+        if annotation in self.titles:
+            self.titles.move_to_end(annotation)
+            return self.titles[annotation]
+        title = self.titles[annotation] = self.title(annotation)
+        if len(self.titles) > self.maxSize:
+            self.titles.popitem(last=False)
+        return title
+
+    def put(self, annotation, title):
+        self.titles[annotation] = title
+        if len(self.titles) > self.maxSize:
+            self.titles.popitem(last=False)
+
+    def pop(self, annotation):
+        return self.titles.pop(annotation, None)
+
+    def peek(self, annotation):
+        if annotation in self.titles:
+            self.titles.move_to_end(annotation)
+            return self.titles[annotation]
+        return None
+
+    def invalidate(self, annotation):
+        self.titles.pop(annotation, None)
+
+    def clear(self):
+        self.titles.clear()
+
+class TextIndex:
+
+    # Inverted index from the words of text(annotation) to the annotations,
+    # searched by word prefix. Invalidated annotations are only indexed
+    # again at the next search.
+    def __init__(self, text):
+        self.text = text
+        self.tokens = {}
+        self.postings = {}
+        self.sortedTokens = []
+        self.dirty = set()
+
+    def __contains__(self, annotation):
+        return annotation in self.tokens or annotation in self.dirty
+
+    def add(self, annotation):
+        self.dirty.add(annotation)
+
+    def invalidate(self, annotation):
+        if annotation in self:
+            self.dirty.add(annotation)
+
+    def remove(self, annotation):
+        self.dirty.discard(annotation)
+        for token in self.tokens.pop(annotation, ()):
+            postings = self.postings[token]
+            postings.discard(annotation)
+            if not postings:
+                del self.postings[token]
+                del self.sortedTokens[bisect_left(self.sortedTokens, token)]
+
+    def clear(self):
+        self.tokens = {}
+        self.postings = {}
+        self.sortedTokens = []
+        self.dirty = set()
+
+    def update(self):
+        dirty, self.dirty = self.dirty, set()
+        added = []
+        for annotation in dirty:
+            self.remove(annotation)
+            tokens = self.tokens[annotation] = tokenize(self.text(annotation))
+            for token in tokens:
+                if token not in self.postings:
+                    self.postings[token] = set()
+                    added.append(token)
+                self.postings[token].add(annotation)
+        if len(added) > 64:
+            self.sortedTokens = sorted(self.sortedTokens+added)
+        else:
+            for token in added:
+                insort(self.sortedTokens, token)
+
+    def prefixMatches(self, prefix):
+        matches = set()
+        i = bisect_left(self.sortedTokens, prefix)
+        while i < len(self.sortedTokens) and self.sortedTokens[i].startswith(prefix):
+            matches |= self.postings[self.sortedTokens[i]]
+            i += 1
+        return matches
+
+    def search(self, query):
+        # Returns the annotations matching every word of query, None if the
+        # query has no word.
+        self.update()
+        result = None
+        for token in sorted(tokenize(query), key=len, reverse=True):
+            matches = self.prefixMatches(token)
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result
+
+class GridIndex:
+
+    # Spatial index bucketing the annotation positions in square cells. The
+    # cell size is chosen so that a cell holds a few points on average, and
+    # the index is built again when the inserted points make it a poor fit.
+    def __init__(self, cellSize=1.0):
+        self.cellSize = cellSize
+        self.points = {}
+        self.cells = {}
+        self.bounds = None
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, annotation):
+        return annotation in self.points
+
+    def cell(self, x, y):
+        return math.floor(x/self.cellSize), math.floor(y/self.cellSize)
+
+    def insert(self, annotation, x, y):
+        self.place(annotation, x, y)
+        if self.bounds is None:
+            self.bounds = (x, y, x, y)
+        else:
+            xmin, ymin, xmax, ymax = self.bounds
+            self.bounds = (min(xmin, x), min(ymin, y), max(xmax, x), max(ymax, y))
+        # Rebuilding when the cell size is off by a factor of two keeps the
+        # cost of the insertions amortized constant.
+        cellSize = self.fittingCellSize(len(self.points))
+        if not self.cellSize/2 <= cellSize <= 2*self.cellSize:
+            self.build([(annotation, x, y) for annotation, (x, y) in self.points.items()])
+
+    def place(self, annotation, x, y):
+        self.remove(annotation)
+        self.points[annotation] = (x, y)
+        self.cells.setdefault(self.cell(x, y), set()).add(annotation)
+
+    def remove(self, annotation):
+        point = self.points.pop(annotation, None)
+        if point is None:
+            return False
+        key = self.cell(*point)
+        self.cells[key].discard(annotation)
+        if not self.cells[key]:
+            del self.cells[key]
+        return True
+
+    def clear(self):
+        self.points = {}
+        self.cells = {}
+        self.bounds = None
+
+    def fittingCellSize(self, count):
+        xmin, ymin, xmax, ymax = self.bounds
+        area = (xmax-xmin)*(ymax-ymin)
+        return math.sqrt(4*area/count) if area > 0 else max(xmax-xmin, ymax-ymin, 1.0)
+
+    def build(self, points):
+        # points is an iterable of (annotation, x, y).
+        points = list(points)
+        self.clear()
+        if points:
+            xs = [p[1] for p in points]
+            ys = [p[2] for p in points]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+            self.cellSize = self.fittingCellSize(len(points))
+        for annotation, x, y in points:
+            self.place(annotation, x, y)
+
+    def query(self, xmin, ymin, xmax, ymax):
+        i0, j0 = self.cell(xmin, ymin)
+        i1, j1 = self.cell(xmax, ymax)
+        if (i1-i0+1)*(j1-j0+1) > len(self.cells):
+            keys = [key for key in self.cells if i0 <= key[0] <= i1 and j0 <= key[1] <= j1]
+        else:
+            keys = [(i, j) for i in range(i0, i1+1) for j in range(j0, j1+1) if (i, j) in self.cells]
+        result = set()
+        for i, j in keys:
+            bucket = self.cells[(i, j)]
+            if i0 < i < i1 and j0 < j < j1:
+                result |= bucket
+            else:
+                result.update(a for a in bucket if xmin <= self.points[a][0] <= xmax and ymin <= self.points[a][1] <= ymax)
+        return result
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Like core, this module must not import Qt nor QGIS.
+
+import numpy as np
+
+from .core import IndexListener
+
+def representatives(points, cellSize):
+    # Indexes of the first of points, a sequence of (x, y), in each square
+    # cell of size cellSize, in increasing order.
+    if not len(points):
+        return []
+    cells = np.floor(np.asarray(points, dtype=float)/cellSize).astype(np.int64)
+    return np.sort(np.unique(cells, axis=0, return_index=True)[1]).tolist()
+
+class Declutterer(IndexListener):
+
+    # Hides the annotations of an AnnotationIndex sharing a cell with an
+    # annotation listed before them, and keeps track of them to show them
+    # again in restore(). Only the annotations visible or hidden by the
+    # declutterer are considered; the ones whose visibility was changed by
+    # the user meanwhile are left as they are.
+    def __init__(self, annotationIndex):
+        self.annotationIndex = annotationIndex
+        self.hidden = set()
+        self.chosen = set()
+        self.annotationIndex.listeners.append(self)
+
+    def update(self, xmin, ymin, xmax, ymax, cellSize):
+        index = self.annotationIndex
+        live = set(index.annotations())
+        self.hidden &= live
+        self.chosen &= live
+        inView = index.annotationsIn(xmin, ymin, xmax, ymax) & live
+        candidates = sorted((annotation for annotation in inView if (annotation.isVisible() or annotation in self.hidden) and annotation not in self.chosen), key=index.rows.__getitem__)
+        points = index.buildSpatialIndex().points
+        keep = {candidates[i] for i in representatives([points[annotation] for annotation in candidates], cellSize)}
+        show = [annotation for annotation in self.hidden if annotation in keep or annotation not in inView]
+        hide = [annotation for annotation in candidates if annotation not in keep and annotation.isVisible()]
+        self.hidden.difference_update(show)
+        self.hidden.update(hide)
+        index.toggleVisibility([annotation for annotation in show if not annotation.isVisible()]+hide)
+        return len(self.hidden)
+
+    def indexVisibilityChosen(self, annotations, visible):
+        # Only the annotations whose visibility changes are left as they are,
+        # the others stay candidates.
+        self.chosen.update(annotation for annotation in annotations if annotation.isVisible() != visible)
+        self.hidden.difference_update(annotations)
+
+    def clear(self):
+        self.hidden = set()
+        self.chosen = set()
+
+    def restore(self):
+        live = set(self.annotationIndex.annotations())
+        self.annotationIndex.toggleVisibility([annotation for annotation in self.hidden if annotation in live and not annotation.isVisible()])
+        self.hidden = set()
+
+    def unload(self):
+        self.restore()
+        self.annotationIndex.listeners.remove(self)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtCore import QCoreApplication
+from qgis.PyQt.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QCheckBox, QPushButton, QTableWidget, QTableWidgetItem, QFileDialog, QDialogButtonBox
+
+from qgis.core import Qgis, QgsMessageLog
+
+from .instrumentation import profiler
+
+class DiagnosticsDialog(QDialog):
+
+    columns = ['name', 'calls', 'total', 'mean', 'p95', 'processed']
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(self.tr('Annotation manager diagnostics'))
+
+        self.recording = QCheckBox(self.tr('Record the duration of the dock operations'))
+        self.recording.setChecked(profiler.enabled)
+        self.recording.toggled.connect(self.enableRecording)
+
+        self.table = QTableWidget(0, len(self.columns))
+        self.table.setHorizontalHeaderLabels([self.tr('Operation'), self.tr('Calls'), self.tr('Total (ms)'), self.tr('Mean (ms)'), self.tr('p95 (ms)'), self.tr('Annotations')])
+        self.table.verticalHeader().setVisible(False)
+
+        buttons = QHBoxLayout()
+        for text, slot in [(self.tr('Refresh'), self.refresh), (self.tr('Reset'), self.reset), (self.tr('Write to the log'), self.log), (self.tr('Save as JSON...'), self.save)]:
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            buttons.addWidget(button)
+        close = QDialogButtonBox(QDialogButtonBox.Close)
+        close.rejected.connect(self.reject)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.recording)
+        layout.addWidget(self.table)
+        layout.addLayout(buttons)
+        layout.addWidget(close)
+        self.setLayout(layout)
+        self.resize(600, 300)
+        self.refresh()
+
+    def tr(self, message):
+        return QCoreApplication.translate('AnnotationManager', message)
+
+    def enableRecording(self, enabled):
+        profiler.enabled = enabled
+
+    def refresh(self):
+        report = profiler.report()
+        self.table.setRowCount(len(report))
+        for row, line in enumerate(report):
+            for column, key in enumerate(self.columns):
+                value = line[key]
+                self.table.setItem(row, column, QTableWidgetItem('{:.2f}'.format(value) if isinstance(value, float) else str(value)))
+        self.table.resizeColumnsToContents()
+
+    def reset(self):
+        profiler.reset()
+        self.refresh()
+
+    def log(self):
+        for line in profiler.report():
+            QgsMessageLog.logMessage('{name}: {calls} calls, {total:.2f} ms total, {mean:.2f} ms mean, {p95:.2f} ms p95, {processed} annotations'.format(**line), 'AnnotationManager', Qgis.Info)
+
+    def save(self):
+        path, _ = QFileDialog.getSaveFileName(self, self.tr('Save the diagnostics'), '', 'JSON (*.json)')
+        if path:
+            profiler.dump(path)
@@ -0,0 +1,603 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtCore import Qt, QItemSelection, QItemSelectionModel, QSize, QCoreApplication, QUuid
+from qgis.PyQt.QtGui import QIcon
+from qgis.PyQt.QtWidgets import QWidget, QDockWidget, QListView, QTreeView, QAbstractItemView, QAction, QVBoxLayout, QToolBar, QToolButton, QMenu, QUndoStack, QInputDialog, QFileDialog
+
+from qgis.core import QgsApplication, QgsAnnotationManager, QgsProject, QgsCoordinateTransform, QgsCsException
+from qgis.gui import QgsFilterLineEdit
+from . import resources
+from .core import AnnotationIndex, contiguousRanges
+from .instrumentation import instrumented, profiler
+from .diagnostics import DiagnosticsDialog
+from .model import AnnotationListModel, AnnotationFilterModel, annotationFingerprint, annotationsChecksum, annotationText, annotationTitle, nextTick
+from .tree import AnnotationTreeModel
+from .declutter import Declutterer
+from .selecttool import AnnotationSelectTool
+from .expression import ExpressionDialog, matchingAnnotations
+from .highlight import AnnotationHighlight
+from .commands import RemoveAnnotationsCommand
+from .exchange import AnnotationExporter, AnnotationImporter
+from .generate import GenerateAnnotationsTask, GenerateAnnotationsDialog
+
+# Size in pixels of the cells holding at most one annotation when decluttering.
+DECLUTTER_CELL = 64
+
+class AnnotationDock:
+
+    def __init__(self, iface):
+        self.iface = iface
+        self.iface.projectRead.connect(self.projectOpen)
+        
+        self.dock = QDockWidget(self.tr('Annotations') )
+        self.dock.setObjectName('AnnotationManagerDock')
+        self.manager = QWidget()
+        toolbar = QToolBar()
+        
+        self.project = QgsProject.instance()
+        self.annotationManager = self.project.annotationManager()
+        self.annotationIndex = AnnotationIndex(self.annotationManager, annotationTitle, annotationText, nextTick, fingerprint=annotationFingerprint)
+        self.model = AnnotationListModel(self.annotationIndex)
+        self.model.dataChanged.connect(self.checkItem)
+        self.proxy = AnnotationFilterModel(self.model)
+
+        self.filterEdit = QgsFilterLineEdit()
+        self.filterEdit.setPlaceholderText(self.tr('Filter annotations...'))
+        self.filterEdit.textChanged.connect(self.filterAnnotations)
+
+        self.annotationList = QListView()
+        self.annotationList.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.annotationList.setUniformItemSizes(True)
+        self.annotationList.setModel(self.proxy)
+        self.annotationList.selectionModel().selectionChanged.connect(self.selectAnnotation)
+
+        self.treeModel = None
+        self.annotationTree = QTreeView()
+        self.annotationTree.setHeaderHidden(True)
+        self.annotationTree.setUniformRowHeights(True)
+        self.annotationTree.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.annotationTree.hide()
+        action_refresh = QAction(QIcon(':/plugins/annotationManager/resources/mActionDraw.png'), self.tr('Refresh the annotations list'), self.manager)
+        action_refresh.triggered.connect(self.refreshAnnotations)
+        action_remove = QAction(QIcon(':/plugins/annotationManager/resources/mActionRemoveAnnotation.png'), self.tr('Remove the selected annotation'), self.manager)
+        action_remove.triggered.connect(self.removeAnnotation)
+
+        self.undoStack = QUndoStack(self.manager)
+        self.project.cleared.connect(self.undoStack.clear)
+        self.project.cleared.connect(self.projectCleared)
+        action_undo = self.undoStack.createUndoAction(self.manager, self.tr('Undo'))
+        action_undo.setIcon(QgsApplication.getThemeIcon('/mActionUndo.svg'))
+        action_redo = self.undoStack.createRedoAction(self.manager, self.tr('Redo'))
+        action_redo.setIcon(QgsApplication.getThemeIcon('/mActionRedo.svg'))
+
+        viewMenu = QMenu()
+        action_showAll = QAction(QIcon(':/plugins/annotationManager/resources/mActionShowAll.png'), self.tr('Show all annotations'), self.manager)
+        action_showAll.triggered.connect(self.showAll)
+        action_hideAll = QAction(QIcon(':/plugins/annotationManager/resources/mActionHideAll.png'), self.tr('Hide all annotations'), self.manager)
+        action_hideAll.triggered.connect(self.hideAll)
+        action_showAllSelected = QAction(QIcon(':/plugins/annotationManager/resources/mActionShowAll.png'), self.tr('Show all selected annotations'), self.manager)
+        action_showAllSelected.triggered.connect(self.showAllSelected)
+        action_hideAllSelected = QAction(QIcon(':/plugins/annotationManager/resources/mActionHideAll.png'), self.tr('Hide all selected annotations'), self.manager)
+        action_hideAllSelected.triggered.connect(self.hideAllSelected)
+        viewMenu.addAction(action_showAll)
+        viewMenu.addAction(action_hideAll)
+        viewMenu.addAction(action_showAllSelected)
+        viewMenu.addAction(action_hideAllSelected)
+        action_showOnlyInView = QAction(QIcon(':/plugins/annotationManager/resources/mActionShowAll.png'), self.tr('Show only annotations in the map view'), self.manager)
+        action_showOnlyInView.triggered.connect(self.showOnlyInView)
+        action_hideOutsideView = QAction(QIcon(':/plugins/annotationManager/resources/mActionHideAll.png'), self.tr('Hide annotations outside the map view'), self.manager)
+        action_hideOutsideView.triggered.connect(self.hideOutsideView)
+        viewMenu.addSeparator()
+        viewMenu.addAction(action_showOnlyInView)
+        viewMenu.addAction(action_hideOutsideView)
+        viewButton = QToolButton()
+        viewButton.setIcon(QIcon(':/plugins/annotationManager/resources/mActionShowAll.png'))
+        viewButton.setPopupMode(2)
+        viewButton.setMenu(viewMenu)
+
+        self.presetMenu = QMenu()
+        self.presetMenu.aboutToShow.connect(self.populatePresetMenu)
+        presetButton = QToolButton()
+        presetButton.setIcon(QgsApplication.getThemeIcon('/mActionShowPresets.svg'))
+        presetButton.setToolTip(self.tr('Visibility presets'))
+        presetButton.setPopupMode(2)
+        presetButton.setMenu(self.presetMenu)
+
+        toolbar.addAction(action_refresh)
+        toolbar.addAction(action_remove)
+        toolbar.addAction(action_undo)
+        toolbar.addAction(action_redo)
+        toolbar.addWidget(viewButton)
+        toolbar.addWidget(presetButton)
+        self.action_inView = QAction(QgsApplication.getThemeIcon('/mActionZoomFullExtent.svg'), self.tr('Only list annotations in the map view'), self.manager)
+        self.action_inView.setCheckable(True)
+        self.action_inView.toggled.connect(self.listInView)
+        toolbar.addAction(self.action_inView)
+        self.action_select = QAction(QgsApplication.getThemeIcon('/mActionSelectRectangle.svg'), self.tr('Select annotations on the map'), self.manager)
+        self.action_select.setCheckable(True)
+        self.action_select.triggered.connect(self.selectOnMap)
+        toolbar.addAction(self.action_select)
+        action_expression = QAction(QgsApplication.getThemeIcon('/mIconExpressionSelect.svg'), self.tr('Select or act by expression...'), self.manager)
+        action_expression.triggered.connect(self.expressionDialog)
+        toolbar.addAction(action_expression)
+        self.action_tree = QAction(QgsApplication.getThemeIcon('/mActionGroupItems.svg'), self.tr('Group annotations by type and layer'), self.manager)
+        self.action_tree.setCheckable(True)
+        self.action_tree.toggled.connect(self.groupAnnotations)
+        toolbar.addAction(self.action_tree)
+        self.action_declutter = QAction(QgsApplication.getThemeIcon('/mActionHideAllLayers.svg'), self.tr('Declutter dense annotations'), self.manager)
+        self.action_declutter.setCheckable(True)
+        self.action_declutter.toggled.connect(self.declutterAnnotations)
+        toolbar.addAction(self.action_declutter)
+        action_diagnostics = QAction(QgsApplication.getThemeIcon('/mActionOptions.svg'), self.tr('Diagnostics'), self.manager)
+        action_diagnostics.triggered.connect(self.showDiagnostics)
+        action_export = QAction(QgsApplication.getThemeIcon('/mActionSharingExport.svg'), self.tr('Export the annotations...'), self.manager)
+        action_export.triggered.connect(self.exportAnnotations)
+        action_import = QAction(QgsApplication.getThemeIcon('/mActionSharingImport.svg'), self.tr('Import annotations...'), self.manager)
+        action_import.triggered.connect(self.importAnnotations)
+        action_generate = QAction(QgsApplication.getThemeIcon('/mActionTextAnnotation.svg'), self.tr('Create annotations from a layer...'), self.manager)
+        action_generate.triggered.connect(self.generateAnnotations)
+        toolbar.addAction(action_generate)
+        toolbar.addAction(action_export)
+        toolbar.addAction(action_import)
+        toolbar.addAction(action_diagnostics)
+        toolbar.setIconSize(QSize(16, 16))
+        
+        p1_vertical = QVBoxLayout()
+        p1_vertical.setContentsMargins(0,0,0,0)
+        p1_vertical.addWidget(toolbar)
+        p1_vertical.addWidget(self.filterEdit)
+        p1_vertical.addWidget(self.annotationList)
+        p1_vertical.addWidget(self.annotationTree)
+        self.manager.setLayout(p1_vertical)
+        
+        self.dock.setWidget(self.manager)
+        self.dock.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
+        self.iface.addDockWidget(Qt.LeftDockWidgetArea, self.dock)
+        self.iface.mainWindow().restoreDockWidget(self.dock)
+        
+        self.canvas = self.iface.mapCanvas()
+        self.transforms = {}
+        self.annotationIndex.setPositionFunction(self.canvasPosition)
+        self.canvas.destinationCrsChanged.connect(self.canvasCrsChanged)
+        self.canvas.extentsChanged.connect(self.canvasExtentChanged)
+        self.canvas.scaleChanged.connect(self.scheduleDeclutter)
+        self.declutterer = None
+        self.declutterScheduled = False
+        self.selectTool = AnnotationSelectTool(self.canvas, self.annotationIndex)
+        self.selectTool.setAction(self.action_select)
+        self.selectTool.annotationsSelected.connect(self.selectAnnotations)
+
+        self.tasks = []
+
+        self.highlight = AnnotationHighlight(self.canvas, self.canvasPosition)
+        self.annotationManager.annotationAboutToBeRemoved.connect(self.highlight.discard)
+
+        self.project.writeProject.connect(self.writeIdentifiers)
+        self.project.writeProject.connect(self.restoreDecluttered)
+
+        self.refreshAnnotations()
+        self.readIdentifiers()
+        self.loadedProject = self.projectKey()
+
+    def canvasPosition(self, annotation):
+        if not annotation.hasFixedMapPosition():
+            return None
+        point = annotation.mapPosition()
+        crs = annotation.mapPositionCrs()
+        if crs.isValid():
+            destination = self.canvas.mapSettings().destinationCrs()
+            if crs != destination:
+                transform = self.transforms.get(crs.authid())
+                if transform is None:
+                    transform = self.transforms[crs.authid()] = QgsCoordinateTransform(crs, destination, self.project)
+                try:
+                    point = transform.transform(point)
+                except QgsCsException:
+                    return None
+        return point.x(), point.y()
+
+    def canvasCrsChanged(self):
+        self.transforms = {}
+        self.annotationIndex.setPositionFunction(self.canvasPosition)
+        self.highlight.invalidate()
+
+    def canvasExtent(self):
+        extent = self.canvas.extent()
+        return extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum()
+
+    def canvasExtentChanged(self):
+        if self.action_inView.isChecked():
+            self.proxy.setExtent(self.canvasExtent())
+        self.scheduleDeclutter()
+
+    def declutterAnnotations(self, checked):
+        if checked:
+            self.declutterer = Declutterer(self.annotationIndex)
+            self.declutter()
+        elif self.declutterer is not None:
+            self.declutterer.unload()
+            self.declutterer = None
+
+    def restoreDecluttered(self, document=None):
+        # The annotations are written after the writeProject signal: the ones
+        # hidden by the declutterer are shown for the project to save them
+        # visible, and hidden again at the next tick.
+        if self.declutterer is not None and self.declutterer.hidden:
+            self.declutterer.restore()
+            self.scheduleDeclutter()
+
+    def decluttered(self, annotation):
+        # Hidden for now only, the annotation stays selected.
+        return self.declutterer is not None and annotation in self.declutterer.hidden
+
+    def projectCleared(self):
+        if self.declutterer is not None:
+            self.declutterer.clear()
+
+    def scheduleDeclutter(self, *args):
+        # extentsChanged and scaleChanged are emitted together when zooming.
+        if self.declutterer is not None and not self.declutterScheduled:
+            self.declutterScheduled = True
+            nextTick(self.declutter)
+
+    @instrumented('declutter')
+    def declutter(self):
+        self.declutterScheduled = False
+        if self.declutterer is not None:
+            profiler.processed(self.declutterer.update(*self.canvasExtent(), DECLUTTER_CELL*self.canvas.mapUnitsPerPixel()))
+
+    def listInView(self, checked):
+        self.proxy.setExtent(self.canvasExtent() if checked else None)
+
+    def annotationsByView(self):
+        inView = self.annotationIndex.annotationsIn(*self.canvasExtent())
+        inside, outside = [], []
+        for annotation in self.annotationIndex.annotations():
+            if annotation in inView or not self.annotationIndex.hasMapPosition(annotation):
+                inside.append(annotation)
+            else:
+                outside.append(annotation)
+        return inside, outside
+
+    def showOnlyInView(self):
+        inside, outside = self.annotationsByView()
+        self.setVisibility(outside, False)
+        self.setVisibility(inside, True)
+
+    def hideOutsideView(self):
+        self.setVisibility(self.annotationsByView()[1], False)
+
+    def selectedRows(self):
+        return sorted(index.row() for index in self.annotationList.selectionModel().selectedRows())
+
+    def selectedAnnotations(self):
+        if self.treeModel is not None:
+            return self.treeModel.annotations(self.annotationTree.selectionModel().selectedRows())
+        annotations = (self.proxy.annotation(row) for row in self.selectedRows())
+        return [annotation for annotation in annotations if annotation is not None]
+
+    @instrumented('checkItem')
+    def checkItem(self, topLeft, bottomRight, roles=[]):
+        profiler.processed(bottomRight.row()-topLeft.row()+1)
+        selectionModel = self.annotationList.selectionModel()
+        hidden = QItemSelection()
+        for index in selectionModel.selectedRows():
+            row = self.proxy.mapToSource(index).row()
+            if topLeft.row() <= row <= bottomRight.row():
+                annotation = self.model.annotation(row)
+                if annotation is not None and not annotation.isVisible() and not self.decluttered(annotation):
+                    hidden.select(index, index)
+        if not hidden.isEmpty():
+            selectionModel.select(hidden, QItemSelectionModel.Deselect)
+    
+    @instrumented('selectAnnotation')
+    def selectAnnotation(self, selected=None, deselected=None):
+        annotations = self.selectedAnnotations()
+        profiler.processed(len(annotations))
+        self.highlight.setAnnotations(annotations)
+
+    def groupAnnotations(self, checked):
+        if checked:
+            self.treeModel = AnnotationTreeModel(self.annotationIndex)
+            self.annotationTree.setModel(self.treeModel)
+            self.annotationTree.selectionModel().selectionChanged.connect(self.selectAnnotation)
+        else:
+            self.annotationTree.setModel(None)
+            self.treeModel.unload()
+            self.treeModel = None
+        self.annotationTree.setVisible(checked)
+        self.annotationList.setVisible(not checked)
+        self.filterEdit.setEnabled(not checked)
+        self.action_inView.setEnabled(not checked)
+        self.action_select.setEnabled(not checked)
+        if checked and self.canvas.mapTool() is self.selectTool:
+            self.canvas.unsetMapTool(self.selectTool)
+        self.selectAnnotation()
+
+    def selectOnMap(self, checked):
+        if checked:
+            self.canvas.setMapTool(self.selectTool)
+        else:
+            self.canvas.unsetMapTool(self.selectTool)
+
+    def selectAnnotations(self, annotations, add=False):
+        # Selects the listed rows of annotations with a single selection.
+        rows = []
+        for annotation in annotations:
+            row = self.annotationIndex.row(annotation)
+            if row is not None:
+                index = self.proxy.mapFromSource(self.model.index(row))
+                if index.isValid():
+                    rows.append(index.row())
+        selection = QItemSelection()
+        for start, end in contiguousRanges(rows):
+            selection.select(self.proxy.index(start, 0), self.proxy.index(end, 0))
+        flags = QItemSelectionModel.Select if add else QItemSelectionModel.ClearAndSelect
+        self.annotationList.selectionModel().select(selection, flags | QItemSelectionModel.Rows)
+        if rows:
+            self.annotationList.scrollTo(self.proxy.index(min(rows), 0))
+
+    def expressionDialog(self, checked=False):
+        dialog = ExpressionDialog(self.project, self.iface.mainWindow())
+        if dialog.exec_() and dialog.expression():
+            annotations, error = self.runExpression(dialog.expression(), dialog.action())
+            if error:
+                self.iface.messageBar().pushCritical(self.tr('Select or act by expression'), error)
+            else:
+                self.iface.messageBar().pushSuccess(self.tr('Select or act by expression'), self.tr('{} annotation(s) matched.').format(len(annotations)))
+
+    def annotationsByExpression(self, expression):
+        return matchingAnnotations(expression, self.annotationIndex, annotationText, self.project)
+
+    @instrumented('runExpression')
+    def runExpression(self, expression, action='select'):
+        # action is one of expression.ACTIONS.
+        annotations, error = self.annotationsByExpression(expression)
+        profiler.processed(len(self.annotationIndex))
+        if error is None:
+            if action == 'select':
+                self.selectAnnotations(annotations)
+            elif action in ('show', 'hide'):
+                self.setVisibility(annotations, action == 'show')
+            elif action == 'remove':
+                self.removeAnnotations(annotations)
+        return annotations, error
+
+    def filterAnnotations(self, text):
+        self.proxy.setQuery(text)
+
+    def setVisibility(self, annotations, visible):
+        return self.annotationIndex.setVisibility(annotations, visible)
+
+    def showAll(self):
+        self.setVisibility(self.annotationIndex.annotations(), True)
+
+    def hideAll(self):
+        self.setVisibility(self.annotationIndex.annotations(), False)
+
+    def showAllSelected(self):
+        self.setVisibility(self.selectedAnnotations(), True)
+
+    def hideAllSelected(self):
+        self.setVisibility(self.selectedAnnotations(), False)
+    
+    def unload(self):
+        for task in list(self.tasks):
+            task.cancel()
+        self.iface.projectRead.disconnect(self.projectOpen)
+        if self.treeModel is not None:
+            self.treeModel.unload()
+        self.model.unload()
+        self.annotationIndex.detach()
+        self.project.cleared.disconnect(self.undoStack.clear)
+        self.project.cleared.disconnect(self.projectCleared)
+        self.project.writeProject.disconnect(self.writeIdentifiers)
+        self.project.writeProject.disconnect(self.restoreDecluttered)
+        self.annotationManager.annotationAboutToBeRemoved.disconnect(self.highlight.discard)
+        self.canvas.destinationCrsChanged.disconnect(self.canvasCrsChanged)
+        self.canvas.extentsChanged.disconnect(self.canvasExtentChanged)
+        self.canvas.scaleChanged.disconnect(self.scheduleDeclutter)
+        if self.canvas.mapTool() is self.selectTool:
+            self.canvas.unsetMapTool(self.selectTool)
+        self.declutterAnnotations(False)
+        self.canvas.scene().removeItem(self.highlight)
+        self.iface.removeDockWidget(self.dock)
+        self.dock.deleteLater()
+        
+    def tr(self, message):
+        return QCoreApplication.translate('AnnotationManager', message)
+
+    @instrumented('refreshAnnotations')
+    def refreshAnnotations(self, checked=False):
+        self.annotationList.clearSelection()
+        self.annotationIndex.resync()
+        profiler.processed(len(self.annotationIndex))
+            
+    def removeAnnotations(self, annotations):
+        annotations = list(annotations)
+        profiler.processed(len(annotations))
+        if annotations:
+            text = self.tr('Remove {} annotation(s)').format(len(annotations))
+            self.undoStack.push(RemoveAnnotationsCommand(self.annotationIndex, annotations, text))
+
+    @instrumented('removeAnnotation')
+    def removeAnnotation(self, checked=False):
+        self.removeAnnotations(self.selectedAnnotations())
+
+    def exportAnnotations(self, checked=False):
+        path, selectedFilter = QFileDialog.getSaveFileName(self.manager, self.tr('Export the annotations'), '', self.tr('GeoPackage (*.gpkg);;GeoJSON (*.geojson)'))
+        if not path:
+            return
+        if not path.lower().endswith(('.gpkg', '.geojson', '.json')):
+            path += '.geojson' if 'geojson' in selectedFilter else '.gpkg'
+        count, error = self.writeAnnotations(path)
+        if error:
+            self.iface.messageBar().pushCritical(self.tr('Export the annotations'), error)
+        else:
+            self.iface.messageBar().pushSuccess(self.tr('Export the annotations'), self.tr('{} annotation(s) exported.').format(count))
+
+    def importAnnotations(self, checked=False):
+        path = QFileDialog.getOpenFileName(self.manager, self.tr('Import annotations'), '', self.tr('GeoPackage or GeoJSON (*.gpkg *.geojson *.json)'))[0]
+        if not path:
+            return
+        count, error = self.readAnnotations(path)
+        if error:
+            self.iface.messageBar().pushCritical(self.tr('Import annotations'), error)
+        else:
+            self.iface.messageBar().pushSuccess(self.tr('Import annotations'), self.tr('{} annotation(s) imported.').format(count))
+
+    def generateAnnotations(self, checked=False):
+        dialog = GenerateAnnotationsDialog(self.iface.mainWindow())
+        if dialog.exec_() and dialog.layer() is not None and dialog.expression():
+            self.createAnnotations(dialog.layer(), dialog.expression(), dialog.linked())
+
+    def createAnnotations(self, layer, expression, link=False):
+        task = GenerateAnnotationsTask(layer, expression, link, self.project, self.batch, nextTick)
+        task.taskCompleted.connect(lambda: self.tasks.remove(task))
+        task.taskTerminated.connect(lambda: self.taskTerminated(task))
+        self.tasks.append(task)
+        QgsApplication.taskManager().addTask(task)
+        return task
+
+    def taskTerminated(self, task):
+        self.tasks.remove(task)
+        if task.error:
+            self.iface.messageBar().pushCritical(self.tr('Create annotations from a layer'), task.error)
+
+    def writeAnnotations(self, path, annotations=None):
+        if annotations is None:
+            annotations = self.annotationIndex.annotations()
+        return AnnotationExporter(self.project, self.project.crs()).export(annotations, path)
+
+    def readAnnotations(self, path):
+        return AnnotationImporter(self.project, self.annotationManager, self.batch).load(path)
+
+    def showDiagnostics(self):
+        DiagnosticsDialog(self.iface.mainWindow()).exec_()
+
+    def batch(self):
+        return self.annotationIndex.batch()
+
+    def connectionCount(self):
+        return self.annotationIndex.connectionCount()
+
+    def projectOpen(self):
+        # The annotations of the previous project are still pending removal.
+        # When the same project is read again, restoring the identifiers
+        # first lets flush() replace them in place by the ones read with the
+        # same identifiers; the annotations of another project, numbered from
+        # 0 as well, must not take the rows of the previous ones.
+        project = self.projectKey()
+        if project[0] and project == self.loadedProject:
+            self.readIdentifiers()
+            self.annotationIndex.flush()
+        else:
+            self.annotationIndex.flush()
+            self.readIdentifiers()
+        self.loadedProject = project
+        self.selectAnnotation()
+        self.scheduleDeclutter()
+
+    def projectKey(self):
+        return self.project.readEntry('annotationManager', 'project', '')[0], self.project.fileName()
+
+    def readIdentifiers(self):
+        # When the annotations do not match the saved identifiers anymore,
+        # the presets would be applied to other annotations: they are marked
+        # as outdated instead.
+        identifiers = self.project.readEntry('annotationManager', 'ids', '')[0].split()
+        checksum = self.project.readEntry('annotationManager', 'checksum', '')[0]
+        matching = bool(identifiers) and checksum == annotationsChecksum(self.annotationManager.annotations())
+        if matching:
+            nextId = self.project.readNumEntry('annotationManager', 'nextId', 0)[0]
+            matching = self.annotationIndex.assignIdentifiers([int(identifier) for identifier in identifiers], nextId)
+        outdated = set(self.presets()).difference(self.outdatedPresets())
+        if not matching and outdated:
+            self.writeOutdatedPresets(self.outdatedPresets()+sorted(outdated))
+            self.iface.messageBar().pushWarning(self.tr('Visibility presets'), self.tr('The annotations changed since the visibility presets were saved, they can not be applied anymore.'))
+        return matching
+
+    def writeIdentifiers(self, document=None):
+        self.annotationIndex.flush()
+        if not self.projectKey()[0]:
+            self.project.writeEntry('annotationManager', 'project', QUuid.createUuid().toString())
+        self.loadedProject = self.projectKey()
+        self.project.writeEntry('annotationManager', 'ids', ' '.join(str(identifier) for identifier in self.annotationIndex.identifiers()))
+        self.project.writeEntry('annotationManager', 'nextId', self.annotationIndex.nextId)
+        self.project.writeEntry('annotationManager', 'checksum', annotationsChecksum(self.annotationManager.annotations()))
+
+    def presets(self):
+        # Stored as two parallel lists as the names can not be used as keys.
+        names = self.project.readListEntry('annotationManager', 'presetNames')[0]
+        values = self.project.readListEntry('annotationManager', 'presetValues')[0]
+        return dict(zip(names, values))
+
+    def writePresets(self, presets):
+        self.project.writeEntry('annotationManager', 'presetNames', list(presets.keys()))
+        self.project.writeEntry('annotationManager', 'presetValues', list(presets.values()))
+        self.writeOutdatedPresets([name for name in self.outdatedPresets() if name in presets])
+
+    def outdatedPresets(self):
+        return self.project.readListEntry('annotationManager', 'outdatedPresets')[0]
+
+    def writeOutdatedPresets(self, names):
+        self.project.writeEntry('annotationManager', 'outdatedPresets', names)
+
+    def savePreset(self, name):
+        presets = self.presets()
+        presets[name] = self.annotationIndex.visibilityPreset()
+        self.writeOutdatedPresets([outdated for outdated in self.outdatedPresets() if outdated != name])
+        self.writePresets(presets)
+
+    def removePreset(self, name):
+        presets = self.presets()
+        if presets.pop(name, None) is not None:
+            self.writePresets(presets)
+
+    def applyPreset(self, name):
+        preset = self.presets().get(name)
+        if preset is None:
+            return False
+        if name in self.outdatedPresets():
+            self.iface.messageBar().pushWarning(self.tr('Visibility presets'), self.tr('The preset {} was saved for other annotations and can not be applied.').format(name))
+            return False
+        self.annotationIndex.applyPreset(preset)
+        return True
+
+    def addPreset(self, checked=False):
+        name, ok = QInputDialog.getText(self.manager, self.tr('Visibility presets'), self.tr('Name of the preset:'))
+        if ok and name:
+            self.savePreset(name)
+
+    def populatePresetMenu(self):
+        self.presetMenu.clear()
+        self.presetMenu.addAction(self.tr('Save the current visibility as a preset...'), self.addPreset)
+        presets = self.presets()
+        if presets:
+            self.presetMenu.addSeparator()
+            outdated = self.outdatedPresets()
+            for name in presets:
+                action = self.presetMenu.addAction(name, lambda name=name: self.applyPreset(name))
+                if name in outdated:
+                    action.setText(self.tr('{} (outdated)').format(name))
+                    action.setEnabled(False)
+            removeMenu = self.presetMenu.addMenu(self.tr('Remove a preset'))
+            for name in presets:
+                removeMenu.addAction(name, lambda name=name: self.removePreset(name))
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.PyQt.QtGui import QTextDocument
+
+from qgis.core import QgsVectorFileWriter, QgsVectorLayer, QgsFields, QgsField, QgsFeature, QgsGeometry, QgsWkbTypes, QgsCoordinateTransform, QgsCsException, QgsTextAnnotation, QgsSvgAnnotation, QgsHtmlAnnotation
+from qgis.gui import QgsFormAnnotation
+from .model import tr
+
+# Number of features written or annotations added at once, so that neither
+# the whole layer nor the whole annotation list is held in memory.
+CHUNK = 1000
+
+def exchangeFields():
+    fields = QgsFields()
+    fields.append(QgsField('type', QVariant.String))
+    fields.append(QgsField('visible', QVariant.Bool))
+    fields.append(QgsField('layer', QVariant.String))
+    fields.append(QgsField('content', QVariant.String))
+    return fields
+
+def annotationContent(annotation):
+    if isinstance(annotation, QgsTextAnnotation):
+        return annotation.document().toHtml()
+    if isinstance(annotation, QgsHtmlAnnotation):
+        return annotation.sourceFile()
+    if isinstance(annotation, QgsSvgAnnotation):
+        return annotation.filePath()
+    if isinstance(annotation, QgsFormAnnotation):
+        return annotation.designerForm()
+    return None
+
+def createAnnotation(kind, content):
+    content = content or ''
+    if kind == 'QgsTextAnnotation':
+        annotation = QgsTextAnnotation()
+        document = QTextDocument()
+        document.setHtml(content)
+        annotation.setDocument(document)
+    elif kind == 'QgsHtmlAnnotation':
+        annotation = QgsHtmlAnnotation()
+        annotation.setSourceFile(content)
+    elif kind == 'QgsSvgAnnotation':
+        annotation = QgsSvgAnnotation()
+        annotation.setFilePath(content)
+    elif kind == 'QgsFormAnnotation':
+        annotation = QgsFormAnnotation()
+        annotation.setDesignerForm(content)
+    else:
+        return None
+    return annotation
+
+class AnnotationExporter:
+
+    def __init__(self, project, crs):
+        self.project = project
+        self.crs = crs
+        self.fields = exchangeFields()
+        self.transforms = {}
+
+    def feature(self, annotation):
+        layer = annotation.mapLayer()
+        feature = QgsFeature(self.fields)
+        feature.setAttributes([annotation.metaObject().className(), annotation.isVisible(), layer.id() if layer is not None else None, annotationContent(annotation)])
+        if annotation.hasFixedMapPosition():
+            point = annotation.mapPosition()
+            crs = annotation.mapPositionCrs()
+            if crs.isValid() and crs != self.crs:
+                transform = self.transforms.get(crs.authid())
+                if transform is None:
+                    transform = self.transforms[crs.authid()] = QgsCoordinateTransform(crs, self.crs, self.project)
+                try:
+                    point = transform.transform(point)
+                except QgsCsException:
+                    return feature
+            feature.setGeometry(QgsGeometry.fromPointXY(point))
+        return feature
+
+    def export(self, annotations, path):
+        # Returns the number of exported annotations and an error message.
+        driver = 'GeoJSON' if path.lower().endswith(('.geojson', '.json')) else 'GPKG'
+        writer = QgsVectorFileWriter(path, 'UTF-8', self.fields, QgsWkbTypes.Point, self.crs, driver)
+        if writer.hasError() != QgsVectorFileWriter.NoError:
+            return 0, writer.errorMessage()
+        count = 0
+        features = []
+        try:
+            for annotation in annotations:
+                features.append(self.feature(annotation))
+                if len(features) == CHUNK:
+                    if not writer.addFeatures(features):
+                        return count, writer.errorMessage()
+                    count += len(features)
+                    features = []
+            if features and not writer.addFeatures(features):
+                return count, writer.errorMessage()
+            return count+len(features), None
+        finally:
+            del writer
+
+class AnnotationImporter:
+
+    def __init__(self, project, annotationManager, batch):
+        self.project = project
+        self.annotationManager = annotationManager
+        self.batch = batch
+
+    def annotation(self, feature, crs):
+        annotation = createAnnotation(feature['type'], feature['content'])
+        if annotation is None:
+            return None
+        annotation.setVisible(feature['visible'] not in (False, 0))
+        layer = self.project.mapLayer(feature['layer']) if feature['layer'] else None
+        if layer is not None:
+            annotation.setMapLayer(layer)
+        geometry = feature.geometry()
+        if geometry.isNull() or geometry.isEmpty():
+            annotation.setHasFixedMapPosition(False)
+        else:
+            annotation.setHasFixedMapPosition(True)
+            annotation.setMapPosition(geometry.asPoint())
+            annotation.setMapPositionCrs(crs)
+        return annotation
+
+    def add(self, annotations):
+        with self.batch():
+            for annotation in annotations:
+                self.annotationManager.addAnnotation(annotation)
+
+    def load(self, path):
+        # Returns the number of imported annotations and an error message.
+        layer = QgsVectorLayer(path, 'annotations', 'ogr')
+        if not layer.isValid():
+            return 0, layer.error().summary()
+        if any(layer.fields().indexOf(field.name()) < 0 for field in exchangeFields()):
+            return 0, tr('The layer does not contain exported annotations.')
+        count = 0
+        annotations = []
+        for feature in layer.getFeatures():
+            annotation = self.annotation(feature, layer.crs())
+            if annotation is None:
+                continue
+            annotations.append(annotation)
+            if len(annotations) == CHUNK:
+                self.add(annotations)
+                count += len(annotations)
+                annotations = []
+        self.add(annotations)
+        return count+len(annotations), None
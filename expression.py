@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.PyQt.QtWidgets import QDialog, QVBoxLayout, QFormLayout, QComboBox, QDialogButtonBox
+
+from qgis.core import QgsExpression, QgsExpressionContext, QgsExpressionContextUtils, QgsFeature, QgsFeatureRequest, QgsField, QgsFields, QgsGeometry, QgsPointXY
+from qgis.gui import QgsExpressionBuilderWidget
+from .model import tr
+
+ACTIONS = ['select', 'show', 'hide', 'remove']
+
+def expressionFields():
+    fields = QgsFields()
+    fields.append(QgsField('text', QVariant.String))
+    fields.append(QgsField('type', QVariant.String))
+    fields.append(QgsField('visible', QVariant.Bool))
+    fields.append(QgsField('x', QVariant.Double))
+    fields.append(QgsField('y', QVariant.Double))
+    fields.append(QgsField('layer', QVariant.String))
+    fields.append(QgsField('layer_id', QVariant.String))
+    return fields
+
+def expressionContext(project):
+    context = QgsExpressionContext([QgsExpressionContextUtils.globalScope(), QgsExpressionContextUtils.projectScope(project)])
+    context.setFields(expressionFields())
+    return context
+
+def matchingAnnotations(expression, annotationIndex, text, project):
+    # Returns the annotations of annotationIndex for which expression is true,
+    # and an error message. Each annotation is exposed as a feature with the
+    # fields of expressionFields() and its point in the canvas CRS; the text
+    # and the position are only read when the expression uses them.
+    expression = QgsExpression(expression)
+    if expression.hasParserError():
+        return [], expression.parserErrorString()
+    context = expressionContext(project)
+    if not expression.prepare(context):
+        return [], expression.evalErrorString()
+    columns = expression.referencedColumns()
+    allColumns = QgsFeatureRequest.ALL_ATTRIBUTES in columns
+    needsText = allColumns or 'text' in columns
+    needsPosition = allColumns or expression.needsGeometry() or 'x' in columns or 'y' in columns
+    feature = QgsFeature(context.fields())
+    matches = []
+    for annotation in annotationIndex.annotations():
+        layer = annotation.mapLayer()
+        position = annotationIndex.positionOf(annotation) if needsPosition else None
+        feature.setAttributes([
+            text(annotation) if needsText else None,
+            annotation.metaObject().className(),
+            annotation.isVisible(),
+            position[0] if position is not None else None,
+            position[1] if position is not None else None,
+            layer.name() if layer is not None else None,
+            layer.id() if layer is not None else None])
+        feature.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(*position)) if position is not None else QgsGeometry())
+        context.setFeature(feature)
+        value = expression.evaluate(context)
+        if expression.hasEvalError():
+            return [], expression.evalErrorString()
+        if value:
+            matches.append(annotation)
+    return matches, None
+
+class ExpressionDialog(QDialog):
+
+    def __init__(self, project, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(tr('Select or act by expression'))
+
+        self.builder = QgsExpressionBuilderWidget()
+        self.builder.setExpressionContext(expressionContext(project))
+        self.builder.loadFieldNames(expressionFields())
+        self.actionCombo = QComboBox()
+        for action, text in zip(ACTIONS, [tr('Select'), tr('Show'), tr('Hide'), tr('Remove')]):
+            self.actionCombo.addItem(text, action)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        form = QFormLayout()
+        form.addRow(tr('Action'), self.actionCombo)
+        layout = QVBoxLayout()
+        layout.addWidget(self.builder)
+        layout.addLayout(form)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def expression(self):
+        return self.builder.expressionText()
+
+    def action(self):
+        return self.actionCombo.currentData()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtCore import QVariant
+from qgis.PyQt.QtGui import QTextDocument
+from qgis.PyQt.QtWidgets import QDialog, QFormLayout, QCheckBox, QDialogButtonBox
+
+from qgis.core import QgsTask, QgsVectorLayerFeatureSource, QgsExpression, QgsExpressionContext, QgsExpressionContextUtils, QgsFeatureRequest, QgsMapLayerProxyModel, QgsTextAnnotation, QgsWkbTypes
+from qgis.gui import QgsMapLayerComboBox, QgsFieldExpressionWidget
+from .model import tr
+
+# Number of annotations added to the manager per event loop iteration.
+CHUNK = 1000
+
+def textAnnotation(text, point, crs, layer):
+    annotation = QgsTextAnnotation()
+    document = QTextDocument()
+    document.setPlainText(text)
+    annotation.setDocument(document)
+    annotation.setHasFixedMapPosition(True)
+    annotation.setMapPosition(point)
+    annotation.setMapPositionCrs(crs)
+    if layer is not None:
+        annotation.setMapLayer(layer)
+    return annotation
+
+def insertAnnotations(annotationManager, batch, schedule, results, crs, layer, start=0):
+    # Each chunk is added in its own batch and the next one is scheduled, so
+    # the list is refreshed once per chunk and QGIS stays responsive.
+    with batch():
+        for text, point in results[start:start+CHUNK]:
+            annotationManager.addAnnotation(textAnnotation(text, point, crs, layer))
+    if start+CHUNK < len(results):
+        schedule(lambda: insertAnnotations(annotationManager, batch, schedule, results, crs, layer, start+CHUNK))
+
+class GenerateAnnotationsTask(QgsTask):
+
+    # The features are read and the texts evaluated in the task, from a copy
+    # of the layer's source; the annotations are QObjects and are created on
+    # the main thread once the task is finished.
+    def __init__(self, layer, expression, link, project, batch, schedule):
+        super().__init__(tr('Create annotations from {}').format(layer.name()), QgsTask.CanCancel)
+        self.source = QgsVectorLayerFeatureSource(layer)
+        self.fields = layer.fields()
+        self.featureCount = layer.featureCount()
+        self.crs = layer.crs()
+        self.layerId = layer.id() if link else None
+        self.expression = QgsExpression(expression)
+        self.context = QgsExpressionContext(QgsExpressionContextUtils.globalProjectLayerScopes(layer))
+        self.project = project
+        self.batch = batch
+        self.schedule = schedule
+        self.results = []
+        self.error = None
+
+    def run(self):
+        self.expression.prepare(self.context)
+        request = QgsFeatureRequest()
+        columns = self.expression.referencedColumns()
+        if QgsFeatureRequest.ALL_ATTRIBUTES not in columns:
+            request.setSubsetOfAttributes(columns, self.fields)
+        for count, feature in enumerate(self.source.getFeatures(request)):
+            if self.isCanceled():
+                return False
+            if self.featureCount > 0 and count % 1000 == 0:
+                self.setProgress(100*count/self.featureCount)
+            geometry = feature.geometry()
+            if geometry.isNull() or geometry.isEmpty():
+                continue
+            self.context.setFeature(feature)
+            text = self.expression.evaluate(self.context)
+            if self.expression.hasEvalError():
+                self.error = self.expression.evalErrorString()
+                return False
+            if geometry.type() != QgsWkbTypes.PointGeometry or geometry.isMultipart():
+                geometry = geometry.pointOnSurface()
+            self.results.append(('' if text is None or isinstance(text, QVariant) else str(text), geometry.asPoint()))
+        return True
+
+    def finished(self, result):
+        if result:
+            layer = self.project.mapLayer(self.layerId) if self.layerId is not None else None
+            insertAnnotations(self.project.annotationManager(), self.batch, self.schedule, self.results, self.crs, layer)
+
+class GenerateAnnotationsDialog(QDialog):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(tr('Create annotations from a layer'))
+
+        self.layerCombo = QgsMapLayerComboBox()
+        self.layerCombo.setFilters(QgsMapLayerProxyModel.HasGeometry)
+        self.expressionWidget = QgsFieldExpressionWidget()
+        self.expressionWidget.setLayer(self.layerCombo.currentLayer())
+        self.layerCombo.layerChanged.connect(self.expressionWidget.setLayer)
+        self.linkCheck = QCheckBox(tr('Link the annotations to the layer'))
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        layout = QFormLayout()
+        layout.addRow(tr('Layer'), self.layerCombo)
+        layout.addRow(tr('Text'), self.expressionWidget)
+        layout.addRow(self.linkCheck)
+        layout.addRow(buttons)
+        self.setLayout(layout)
+
+    def layer(self):
+        return self.layerCombo.currentLayer()
+
+    def expression(self):
+        return self.expressionWidget.expression()
+
+    def linked(self):
+        return self.linkCheck.isChecked()
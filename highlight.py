@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtCore import QPointF, QRectF
+from qgis.PyQt.QtGui import QColor, QPen, QBrush
+
+from qgis.gui import QgsMapCanvasItem
+
+class AnnotationHighlight(QgsMapCanvasItem):
+
+    # Draws a fixed size box in pixels around each highlighted annotation.
+    # The item covers the whole canvas and the boxes are only computed again
+    # at the first paint following an extent change.
+    def __init__(self, canvas, position, size=20):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.position = position
+        self.size = size
+        self.color = QColor(0,0,255, 128)
+        self.annotations = {}
+        self.rects = None
+        self.canvas.extentsChanged.connect(self.invalidate)
+
+    def setAnnotations(self, annotations):
+        self.annotations = dict.fromkeys(annotations)
+        self.invalidate()
+
+    def discard(self, annotation):
+        if annotation in self.annotations:
+            del self.annotations[annotation]
+            self.invalidate()
+
+    def invalidate(self):
+        self.rects = None
+        self.prepareGeometryChange()
+        self.update()
+
+    def updatePosition(self):
+        self.setPos(QPointF(0, 0))
+        self.invalidate()
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.canvas.width(), self.canvas.height())
+
+    def paint(self, painter, option=None, widget=None):
+        if not self.annotations:
+            return
+        if self.rects is None:
+            mapToPixel = self.canvas.getCoordinateTransform()
+            half = self.size/2
+            self.rects = []
+            for annotation in self.annotations:
+                position = self.position(annotation)
+                if position is not None:
+                    point = mapToPixel.transform(*position)
+                    self.rects.append(QRectF(point.x()-half, point.y()-half, self.size, self.size))
+        painter.setPen(QPen(self.color))
+        painter.setBrush(QBrush(self.color))
+        painter.drawRects(self.rects)
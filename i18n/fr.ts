@@ -30,5 +30,249 @@
         <source>Hide all selected annotations</source>
         <translation>Cacher toutes les annotations sélectionnées</translation>
     </message>
+    <message>
+        <source>Undo</source>
+        <translation>Annuler</translation>
+    </message>
+    <message>
+        <source>Redo</source>
+        <translation>Rétablir</translation>
+    </message>
+    <message>
+        <source>Remove {} annotation(s)</source>
+        <translation>Supprimer {} annotation(s)</translation>
+    </message>
+    <message>
+        <source>Filter annotations...</source>
+        <translation>Filtrer les annotations...</translation>
+    </message>
+    <message>
+        <source>Show only annotations in the map view</source>
+        <translation>Afficher uniquement les annotations de la vue</translation>
+    </message>
+    <message>
+        <source>Hide annotations outside the map view</source>
+        <translation>Cacher les annotations hors de la vue</translation>
+    </message>
+    <message>
+        <source>Only list annotations in the map view</source>
+        <translation>Lister uniquement les annotations de la vue</translation>
+    </message>
+    <message>
+        <source>Diagnostics</source>
+        <translation>Diagnostics</translation>
+    </message>
+    <message>
+        <source>Annotation manager diagnostics</source>
+        <translation>Diagnostics du gestionnaire d'annotations</translation>
+    </message>
+    <message>
+        <source>Record the duration of the dock operations</source>
+        <translation>Enregistrer la durée des opérations du panneau</translation>
+    </message>
+    <message>
+        <source>Operation</source>
+        <translation>Opération</translation>
+    </message>
+    <message>
+        <source>Calls</source>
+        <translation>Appels</translation>
+    </message>
+    <message>
+        <source>Total (ms)</source>
+        <translation>Total (ms)</translation>
+    </message>
+    <message>
+        <source>Mean (ms)</source>
+        <translation>Moyenne (ms)</translation>
+    </message>
+    <message>
+        <source>p95 (ms)</source>
+        <translation>p95 (ms)</translation>
+    </message>
+    <message>
+        <source>Refresh</source>
+        <translation>Actualiser</translation>
+    </message>
+    <message>
+        <source>Reset</source>
+        <translation>Réinitialiser</translation>
+    </message>
+    <message>
+        <source>Write to the log</source>
+        <translation>Écrire dans le journal</translation>
+    </message>
+    <message>
+        <source>Save as JSON...</source>
+        <translation>Enregistrer en JSON...</translation>
+    </message>
+    <message>
+        <source>Save the diagnostics</source>
+        <translation>Enregistrer les diagnostics</translation>
+    </message>
+    <message>
+        <source>&amp;Annotation Manager</source>
+        <translation>&amp;Gestionnaire d'annotations</translation>
+    </message>
+    <message>
+        <source>Group annotations by type and layer</source>
+        <translation>Grouper les annotations par type et par couche</translation>
+    </message>
+    <message>
+        <source>Text annotations</source>
+        <translation>Annotations texte</translation>
+    </message>
+    <message>
+        <source>SVG annotations</source>
+        <translation>Annotations SVG</translation>
+    </message>
+    <message>
+        <source>HTML annotations</source>
+        <translation>Annotations HTML</translation>
+    </message>
+    <message>
+        <source>Form annotations</source>
+        <translation>Annotations formulaire</translation>
+    </message>
+    <message>
+        <source>Other annotations</source>
+        <translation>Autres annotations</translation>
+    </message>
+    <message>
+        <source>No layer</source>
+        <translation>Aucune couche</translation>
+    </message>
+    <message>
+        <source>Visibility presets</source>
+        <translation>Préréglages de visibilité</translation>
+    </message>
+    <message>
+        <source>Name of the preset:</source>
+        <translation>Nom du préréglage :</translation>
+    </message>
+    <message>
+        <source>Save the current visibility as a preset...</source>
+        <translation>Enregistrer la visibilité actuelle comme préréglage...</translation>
+    </message>
+    <message>
+        <source>Remove a preset</source>
+        <translation>Supprimer un préréglage</translation>
+    </message>
+    <message>
+        <source>The layer does not contain exported annotations.</source>
+        <translation>La couche ne contient pas d'annotations exportées.</translation>
+    </message>
+    <message>
+        <source>Export the annotations...</source>
+        <translation>Exporter les annotations...</translation>
+    </message>
+    <message>
+        <source>Import annotations...</source>
+        <translation>Importer des annotations...</translation>
+    </message>
+    <message>
+        <source>Export the annotations</source>
+        <translation>Exporter les annotations</translation>
+    </message>
+    <message>
+        <source>Import annotations</source>
+        <translation>Importer des annotations</translation>
+    </message>
+    <message>
+        <source>GeoPackage (*.gpkg);;GeoJSON (*.geojson)</source>
+        <translation>GeoPackage (*.gpkg);;GeoJSON (*.geojson)</translation>
+    </message>
+    <message>
+        <source>GeoPackage or GeoJSON (*.gpkg *.geojson *.json)</source>
+        <translation>GeoPackage ou GeoJSON (*.gpkg *.geojson *.json)</translation>
+    </message>
+    <message>
+        <source>{} annotation(s) exported.</source>
+        <translation>{} annotation(s) exportée(s).</translation>
+    </message>
+    <message>
+        <source>{} annotation(s) imported.</source>
+        <translation>{} annotation(s) importée(s).</translation>
+    </message>
+    <message>
+        <source>Create annotations from {}</source>
+        <translation>Création d'annotations depuis {}</translation>
+    </message>
+    <message>
+        <source>Create annotations from a layer</source>
+        <translation>Créer des annotations depuis une couche</translation>
+    </message>
+    <message>
+        <source>Create annotations from a layer...</source>
+        <translation>Créer des annotations depuis une couche...</translation>
+    </message>
+    <message>
+        <source>Link the annotations to the layer</source>
+        <translation>Lier les annotations à la couche</translation>
+    </message>
+    <message>
+        <source>Layer</source>
+        <translation>Couche</translation>
+    </message>
+    <message>
+        <source>Text</source>
+        <translation>Texte</translation>
+    </message>
+    <message>
+        <source>Loading...</source>
+        <translation>Chargement...</translation>
+    </message>
+    <message>
+        <source>Declutter dense annotations</source>
+        <translation>Désencombrer les annotations denses</translation>
+    </message>
+    <message>
+        <source>Select annotations on the map</source>
+        <translation>Sélectionner des annotations sur la carte</translation>
+    </message>
+    <message>
+        <source>Select or act by expression</source>
+        <translation>Sélectionner ou agir par expression</translation>
+    </message>
+    <message>
+        <source>Select or act by expression...</source>
+        <translation>Sélectionner ou agir par expression...</translation>
+    </message>
+    <message>
+        <source>{} annotation(s) matched.</source>
+        <translation>{} annotation(s) correspondante(s).</translation>
+    </message>
+    <message>
+        <source>Select</source>
+        <translation>Sélectionner</translation>
+    </message>
+    <message>
+        <source>Show</source>
+        <translation>Afficher</translation>
+    </message>
+    <message>
+        <source>Hide</source>
+        <translation>Masquer</translation>
+    </message>
+    <message>
+        <source>Remove</source>
+        <translation>Supprimer</translation>
+    </message>
+    <message>
+        <source>Action</source>
+        <translation>Action</translation>
+    </message>
+    <message>
+        <source>The annotations changed since the visibility presets were saved, they can not be applied anymore.</source>
+        <translation>Les annotations ont changé depuis l'enregistrement des préréglages de visibilité, ils ne peuvent plus être appliqués.</translation>
+    </message>
+    <message>
+        <source>The preset {} was saved for other annotations and can not be applied.</source>
+        <translation>Le préréglage {} a été enregistré pour d'autres annotations et ne peut pas être appliqué.</translation>
+    </message>
+    <message>
+        <source>{} (outdated)</source>
+        <translation>{} (obsolète)</translation>
+    </message>
 </context>
 </TS>
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Opt-in timing of the dock hot paths. Like core, this module must not
+# import Qt nor QGIS.
+
+import json
+import time
+from collections import deque
+from functools import wraps
+
+class Statistics:
+
+    def __init__(self, samples):
+        self.calls = 0
+        self.total = 0.0
+        self.processed = 0
+        self.durations = deque(maxlen=samples)
+
+    def percentile(self, percent):
+        if not self.durations:
+            return 0.0
+        durations = sorted(self.durations)
+        return durations[min(len(durations)-1, int(len(durations)*percent/100))]
+
+class Profiler:
+
+    def __init__(self, samples=1000):
+        self.enabled = False
+        self.samples = samples
+        self.statistics = {}
+        self.frames = []
+
+    def reset(self):
+        self.statistics = {}
+
+    def record(self, name, duration, processed=0):
+        statistics = self.statistics.get(name)
+        if statistics is None:
+            statistics = self.statistics[name] = Statistics(self.samples)
+        statistics.calls += 1
+        statistics.total += duration
+        statistics.processed += processed
+        statistics.durations.append(duration)
+
+    def processed(self, count):
+        # Counts the annotations processed by the innermost instrumented call.
+        if self.frames:
+            self.frames[-1][0] += count
+
+    def report(self):
+        # Durations are in milliseconds, p95 over the last samples calls.
+        return [{
+            'name': name,
+            'calls': statistics.calls,
+            'total': statistics.total*1000,
+            'mean': statistics.total*1000/statistics.calls,
+            'p95': statistics.percentile(95)*1000,
+            'processed': statistics.processed,
+        } for name, statistics in sorted(self.statistics.items())]
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+profiler = Profiler()
+
+def instrumented(name):
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            frame = [0]
+            profiler.frames.append(frame)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                duration = time.perf_counter()-start
+                profiler.frames.pop()
+                profiler.record(name, duration, frame[0])
+        return wrapper
+    return decorator
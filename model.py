@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtCore import Qt, QAbstractListModel, QAbstractProxyModel, QModelIndex, QTimer, QCoreApplication, pyqtSignal
+
+from qgis.core import QgsTextAnnotation
+
+import zlib
+from bisect import bisect_left, bisect_right
+
+def annotationTitle(annotation):
+    title = 'Annotation'
+    if isinstance(annotation, QgsTextAnnotation):
+        title = annotation.document().toPlainText().split('\n')[0]
+        if len(title) > 40:
+            title = title[:40]+'(...)'
+    return title
+
+def annotationText(annotation):
+    if isinstance(annotation, QgsTextAnnotation):
+        return annotation.document().toPlainText()
+    return ''
+
+def annotationFingerprint(annotation):
+    position = annotation.mapPosition()
+    length = annotation.document().characterCount() if isinstance(annotation, QgsTextAnnotation) else 0
+    return annotation.metaObject().className(), position.x(), position.y(), length
+
+def annotationsChecksum(annotations):
+    # Summary of the annotations and their order, saved with their identifiers
+    # to detect that they were changed while the dock was not loaded.
+    summary = [(annotation.metaObject().className(), round(annotation.mapPosition().x(), 6), round(annotation.mapPosition().y(), 6)) for annotation in annotations]
+    return '{:08x}'.format(zlib.crc32(repr(summary).encode()))
+
+def nextTick(callback):
+    QTimer.singleShot(0, callback)
+
+def tr(message):
+    # Translation in the context of the plugin, for the module level strings
+    # and the classes which are not QObjects.
+    return QCoreApplication.translate('AnnotationManager', message)
+
+class AnnotationListModel(QAbstractListModel):
+
+    textIndexChanged = pyqtSignal()
+    spatialIndexChanged = pyqtSignal()
+
+    def __init__(self, annotationIndex, parent=None):
+        super().__init__(parent)
+        self.annotationIndex = annotationIndex
+        self.annotationIndex.listeners.append(self)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.annotationIndex)
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        annotation = self.annotation(index.row())
+        if annotation is None:
+            return None
+        if role == Qt.DisplayRole:
+            title = self.annotationIndex.cachedTitle(annotation)
+            return self.tr('Loading...') if title is None else title
+        if role == Qt.ToolTipRole:
+            return self.annotationIndex.cachedSnippet(annotation) or None
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if annotation.isVisible() else Qt.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        annotation = self.annotation(index.row())
+        if annotation is None:
+            return False
+        self.annotationIndex.setVisible(annotation, value == Qt.Checked)
+        return True
+
+    def annotation(self, row):
+        return self.annotationIndex.annotation(row)
+
+    def tr(self, message):
+        return tr(message)
+
+    def indexRowsAboutToBeInserted(self, start, end):
+        self.beginInsertRows(QModelIndex(), start, end)
+
+    def indexRowsInserted(self, start, end):
+        self.endInsertRows()
+
+    def indexRowsAboutToBeRemoved(self, start, end):
+        self.beginRemoveRows(QModelIndex(), start, end)
+
+    def indexRowsRemoved(self, start, end):
+        self.endRemoveRows()
+
+    def indexAboutToBeReset(self):
+        self.beginResetModel()
+
+    def indexReset(self):
+        self.endResetModel()
+
+    def indexRowsChanged(self, first, last, titleChanged):
+        roles = [Qt.DisplayRole, Qt.ToolTipRole, Qt.CheckStateRole] if titleChanged else [Qt.CheckStateRole]
+        self.dataChanged.emit(self.index(first), self.index(last), roles)
+
+    def indexTitlesChanged(self, first, last):
+        self.dataChanged.emit(self.index(first), self.index(last), [Qt.DisplayRole, Qt.ToolTipRole])
+
+    def indexVisibilityChosen(self, annotations, visible):
+        pass
+
+    def indexAnnotationsReplaced(self, replaced):
+        pass
+
+    def indexTextChanged(self):
+        self.textIndexChanged.emit()
+
+    def indexPositionsChanged(self):
+        self.spatialIndexChanged.emit()
+
+    def unload(self):
+        self.annotationIndex.listeners.remove(self)
+
+class AnnotationFilterModel(QAbstractProxyModel):
+
+    # Lists the rows of the source model matching the text query and, with an
+    # extent, the ones in the map view. The accepted rows are computed from
+    # the text and spatial indexes instead of testing every row, and are
+    # refiltered at most once per event loop tick.
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.query = ''
+        self.matches = None
+        self.extent = None
+        self.inView = None
+        self.accepted = []
+        self.removed = None
+        self.refilterScheduled = False
+        self.setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self.sourceReset)
+        model.rowsInserted.connect(self.sourceRowsInserted)
+        model.rowsAboutToBeRemoved.connect(self.sourceRowsAboutToBeRemoved)
+        model.rowsRemoved.connect(self.sourceRowsRemoved)
+        model.dataChanged.connect(self.sourceDataChanged)
+        model.textIndexChanged.connect(self.scheduleRefilter)
+        model.spatialIndexChanged.connect(self.scheduleRefilter)
+        self.accepted = self.acceptedRows()
+
+    def annotation(self, row):
+        if not 0 <= row < len(self.accepted):
+            return None
+        return self.sourceModel().annotation(self.accepted[row])
+
+    def index(self, row, column=0, parent=QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < len(self.accepted):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.accepted)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def mapToSource(self, index):
+        if not index.isValid() or index.row() >= len(self.accepted):
+            return QModelIndex()
+        return self.sourceModel().index(self.accepted[index.row()])
+
+    def mapFromSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        row = bisect_left(self.accepted, index.row())
+        if row == len(self.accepted) or self.accepted[row] != index.row():
+            return QModelIndex()
+        return self.createIndex(row, 0)
+
+    def setQuery(self, query):
+        self.query = query
+        self.scheduleRefilter()
+
+    def setExtent(self, extent):
+        # extent is (xmin, ymin, xmax, ymax) or None to list every annotation.
+        self.extent = extent
+        self.scheduleRefilter()
+
+    def scheduleRefilter(self):
+        if not self.refilterScheduled:
+            self.refilterScheduled = True
+            nextTick(self.refilter)
+
+    def refilter(self):
+        self.refilterScheduled = False
+        annotationIndex = self.sourceModel().annotationIndex
+        self.matches = annotationIndex.search(self.query)
+        self.inView = None if self.extent is None else annotationIndex.annotationsIn(*self.extent)
+        accepted = self.acceptedRows()
+        if accepted == self.accepted:
+            return
+        # The selection and the current row follow the rows still accepted.
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        sourceRows = [self.accepted[index.row()] for index in persistent]
+        self.accepted = accepted
+        self.changePersistentIndexList(persistent, [self.mapFromSource(self.sourceModel().index(row)) for row in sourceRows])
+        self.layoutChanged.emit()
+
+    def acceptedRows(self):
+        annotationIndex = self.sourceModel().annotationIndex
+        if self.matches is None and self.inView is None:
+            return list(range(len(annotationIndex)))
+        candidates = self.matches
+        if self.inView is not None:
+            # The annotations without a map position are always listed.
+            inView = self.inView | annotationIndex.annotationsWithoutPosition()
+            candidates = inView if candidates is None else candidates & inView
+        rows = annotationIndex.rows
+        pending = annotationIndex.pendingRemovals
+        return sorted(rows[annotation] for annotation in candidates if annotation in rows and annotation not in pending)
+
+    def acceptsRow(self, row):
+        annotation = self.sourceModel().annotation(row)
+        if annotation is None:
+            return False
+        if self.matches is not None and annotation not in self.matches:
+            return False
+        if self.inView is not None and annotation not in self.inView:
+            return not self.sourceModel().annotationIndex.hasMapPosition(annotation)
+        return True
+
+    def sourceReset(self):
+        self.accepted = self.acceptedRows()
+        self.endResetModel()
+
+    def sourceRowsInserted(self, parent, start, end):
+        count = end-start+1
+        row = bisect_left(self.accepted, start)
+        shifted = [sourceRow+count for sourceRow in self.accepted[row:]]
+        inserted = [sourceRow for sourceRow in range(start, end+1) if self.acceptsRow(sourceRow)]
+        if inserted:
+            self.beginInsertRows(QModelIndex(), row, row+len(inserted)-1)
+        self.accepted = self.accepted[:row]+inserted+shifted
+        if inserted:
+            self.endInsertRows()
+
+    def sourceRowsAboutToBeRemoved(self, parent, start, end):
+        first = bisect_left(self.accepted, start)
+        last = bisect_right(self.accepted, end)
+        self.removed = (first, last, end-start+1)
+        if first < last:
+            self.beginRemoveRows(QModelIndex(), first, last-1)
+
+    def sourceRowsRemoved(self, parent, start, end):
+        first, last, count = self.removed
+        self.removed = None
+        self.accepted = self.accepted[:first]+[sourceRow-count for sourceRow in self.accepted[last:]]
+        if first < last:
+            self.endRemoveRows()
+
+    def sourceDataChanged(self, topLeft, bottomRight, roles=[]):
+        first = bisect_left(self.accepted, topLeft.row())
+        last = bisect_right(self.accepted, bottomRight.row())
+        if first < last:
+            self.dataChanged.emit(self.index(first), self.index(last-1), roles)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from qgis.PyQt.QtCore import Qt, pyqtSignal
+from qgis.PyQt.QtGui import QColor
+from qgis.PyQt.QtWidgets import QApplication
+
+from qgis.core import QgsGeometry, QgsRectangle, QgsWkbTypes
+from qgis.gui import QgsMapTool, QgsRubberBand
+
+class AnnotationSelectTool(QgsMapTool):
+
+    # Emits the visible annotations whose position is the closest to a click,
+    # within tolerance pixels, or inside a dragged rectangle. Both are
+    # queries of the annotation index's spatial index.
+    annotationsSelected = pyqtSignal(list, bool)
+
+    def __init__(self, canvas, annotationIndex, tolerance=10):
+        super().__init__(canvas)
+        self.annotationIndex = annotationIndex
+        self.tolerance = tolerance
+        self.origin = None
+        self.rubberBand = None
+        self.setCursor(Qt.ArrowCursor)
+
+    def rectangle(self, start, end):
+        rectangle = QgsRectangle(self.toMapCoordinates(start), self.toMapCoordinates(end))
+        rectangle.normalize()
+        return rectangle
+
+    def canvasPressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.origin = event.pos()
+
+    def canvasMoveEvent(self, event):
+        if self.origin is None:
+            return
+        if self.rubberBand is None:
+            if (event.pos()-self.origin).manhattanLength() < QApplication.startDragDistance():
+                return
+            self.rubberBand = QgsRubberBand(self.canvas(), QgsWkbTypes.PolygonGeometry)
+            self.rubberBand.setColor(QColor(0,0,255, 64))
+            self.rubberBand.setStrokeColor(QColor(0,0,255, 128))
+        self.rubberBand.setToGeometry(QgsGeometry.fromRect(self.rectangle(self.origin, event.pos())), None)
+
+    def canvasReleaseEvent(self, event):
+        if self.origin is None:
+            return
+        if self.rubberBand is not None:
+            rectangle = self.rectangle(self.origin, event.pos())
+            annotations = self.annotationsIn(rectangle.xMinimum(), rectangle.yMinimum(), rectangle.xMaximum(), rectangle.yMaximum())
+            self.resetRubberBand()
+        else:
+            annotations = self.closest(event.pos())
+        self.origin = None
+        self.annotationsSelected.emit(annotations, bool(event.modifiers() & (Qt.ShiftModifier | Qt.ControlModifier)))
+
+    def annotationsIn(self, xmin, ymin, xmax, ymax):
+        return [annotation for annotation in self.annotationIndex.annotationsIn(xmin, ymin, xmax, ymax) if annotation.isVisible()]
+
+    def closest(self, pos):
+        point = self.toMapCoordinates(pos)
+        tolerance = self.tolerance*self.canvas().mapUnitsPerPixel()
+        candidates = self.annotationsIn(point.x()-tolerance, point.y()-tolerance, point.x()+tolerance, point.y()+tolerance)
+        if not candidates:
+            return []
+        def distance(annotation):
+            x, y = self.annotationIndex.positionOf(annotation)
+            return (x-point.x())**2+(y-point.y())**2
+        return [min(candidates, key=distance)]
+
+    def resetRubberBand(self):
+        if self.rubberBand is not None:
+            self.canvas().scene().removeItem(self.rubberBand)
+            self.rubberBand = None
+
+    def deactivate(self):
+        self.origin = None
+        self.resetRubberBand()
+        super().deactivate()
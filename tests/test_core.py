@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# Regression tests of the annotation index subscriptions, run with
+# `python -m pytest tests`. Like the benchmarks they use fake annotations
+# and do not need QGIS.
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from benchmark import FakeAnnotation, FakeAnnotationManager, fakeAnnotations, fakeText, fakeTitle
+from annotationManager.core import AnnotationIndex, IndexListener
+from annotationManager.instrumentation import profiler
+
+class SubscriptionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = FakeAnnotationManager()
+        self.index = AnnotationIndex(self.manager, fakeTitle, fakeText)
+        self.annotations = fakeAnnotations(10, random.Random(0))
+        with self.index.batch():
+            for annotation in self.annotations:
+                self.manager.addAnnotation(annotation)
+        profiler.reset()
+        profiler.enabled = True
+
+    def tearDown(self):
+        profiler.enabled = False
+        profiler.reset()
+
+    def titleRefreshes(self):
+        statistics = profiler.statistics.get('refreshAnnotationTitle')
+        return statistics.calls if statistics is not None else 0
+
+    def testRepeatedResync(self):
+        connections = self.index.connectionCount()
+        for _ in range(5):
+            self.index.resync()
+        self.assertEqual(self.index.connectionCount(), connections)
+        self.assertEqual(len(self.annotations[0].appearanceChanged.slots), 1)
+        self.annotations[0].appearanceChanged.emit()
+        self.assertEqual(self.titleRefreshes(), 1)
+
+    def testRemoval(self):
+        removed = self.annotations[0]
+        with self.index.batch():
+            self.manager.removeAnnotation(removed)
+        self.assertEqual(self.index.connectionCount(), 2*(len(self.annotations)-1))
+        self.assertEqual(removed.appearanceChanged.slots, [])
+        removed.appearanceChanged.emit()
+        self.assertEqual(self.titleRefreshes(), 0)
+
+    def testMutedRefreshes(self):
+        self.index.setVisibility(self.annotations, False)
+        self.assertEqual(self.titleRefreshes(), 0)
+        self.annotations[0].appearanceChanged.emit()
+        self.assertEqual(self.titleRefreshes(), 1)
+
+    def testDetach(self):
+        self.index.detach()
+        self.assertEqual(self.index.connectionCount(), 0)
+        self.assertTrue(all(not annotation.appearanceChanged.slots for annotation in self.annotations))
+
+class IdentifierTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = FakeAnnotationManager()
+        self.index = AnnotationIndex(self.manager, fakeTitle, fakeText)
+        self.add(fakeAnnotations(12, random.Random(0)))
+
+    def add(self, annotations):
+        with self.index.batch():
+            for annotation in annotations:
+                self.manager.addAnnotation(annotation)
+
+    def reload(self):
+        # Like reading the saved project in a new session: copies of the
+        # annotations get the saved identifiers.
+        identifiers, nextId = self.index.identifiers(), self.index.nextId
+        copies = []
+        for annotation in self.annotations():
+            copies.append(FakeAnnotation(annotation.text, annotation.x, annotation.y))
+            copies[-1].visible = annotation.visible
+        self.manager = FakeAnnotationManager()
+        self.index = AnnotationIndex(self.manager, fakeTitle, fakeText)
+        self.add(copies)
+        return self.index.assignIdentifiers(identifiers, nextId)
+
+    def annotations(self):
+        return self.manager.annotations()
+
+    def testRemovedIdentifierNotReused(self):
+        last = self.annotations()[-1]
+        preset = self.index.visibilityPreset()
+        with self.index.batch():
+            self.manager.removeAnnotation(last)
+        self.assertTrue(self.reload())
+        added = FakeAnnotation('added', 0, 0)
+        added.visible = False
+        self.add([added])
+        self.assertGreater(self.index.identifier(added), int(preset.split(':')[0]))
+        self.assertEqual(self.index.presetChanges(preset), ([], []))
+
+    def testPresetRoundTrip(self):
+        annotations = self.annotations()
+        for annotation in annotations[::3]:
+            annotation.visible = False
+        visible = [annotation.isVisible() for annotation in annotations]
+        preset = self.index.visibilityPreset()
+        self.index.setVisibility(annotations[:6], False)
+        self.index.setVisibility(annotations[6:], True)
+        above = FakeAnnotation('above', 0, 0)
+        above.visible = False
+        self.add([above])
+        show, hide = self.index.presetChanges(preset)
+        self.assertNotIn(above, show+hide)
+        self.index.applyPreset(preset)
+        self.assertEqual([annotation.isVisible() for annotation in annotations], visible)
+        self.assertFalse(above.isVisible())
+        self.assertTrue(self.reload())
+        self.assertEqual(self.index.presetChanges(preset), ([], []))
+
+    def testResyncKeepsIdentifiers(self):
+        identifiers = dict(zip(self.annotations(), self.index.identifiers()))
+        removed = self.annotations()[4]
+        self.manager.items.remove(removed)
+        self.index.resync()
+        self.assertEqual(self.index.identifiers(), [identifiers[annotation] for annotation in self.annotations()])
+        self.assertIsNone(self.index.annotationByIdentifier(identifiers[removed]))
+
+class ReplacementListener(IndexListener):
+
+    def __init__(self):
+        self.replaced = []
+
+    def indexAnnotationsReplaced(self, replaced):
+        self.replaced.extend(replaced)
+
+class ReloadTest(unittest.TestCase):
+
+    # Reading a project again replaces its annotations by new ones, which
+    # the dock pairs with the previous ones by their identifiers.
+    def setUp(self):
+        self.manager = FakeAnnotationManager()
+        self.titles = []
+        self.index = AnnotationIndex(self.manager, self.title, fakeText, fingerprint=fakeText)
+        self.listener = ReplacementListener()
+        self.index.listeners.append(self.listener)
+        self.annotations = fakeAnnotations(10, random.Random(0))
+        with self.index.batch():
+            for annotation in self.annotations:
+                self.manager.addAnnotation(annotation)
+        for annotation in self.annotations:
+            self.index.title(annotation)
+        self.titles = []
+
+    def title(self, annotation):
+        self.titles.append(annotation)
+        return fakeTitle(annotation)
+
+    def read(self, annotations):
+        self.manager.removeAnnotations(self.manager.annotations())
+        for annotation in annotations:
+            self.manager.addAnnotation(annotation)
+
+    def testSameProject(self):
+        identifiers = self.index.identifiers()
+        copies = [FakeAnnotation(annotation.text, annotation.x, annotation.y) for annotation in self.annotations]
+        self.read(copies)
+        self.assertTrue(self.index.assignIdentifiers(identifiers))
+        self.index.flush()
+        self.assertEqual(sorted(self.listener.replaced, key=lambda pair: self.index.row(pair[1])), list(zip(self.annotations, copies)))
+        self.assertEqual([self.index.row(copy) for copy in copies], list(range(len(copies))))
+        self.assertEqual(self.index.identifiers(), identifiers)
+        self.assertEqual([self.index.title(copy) for copy in copies], [fakeTitle(annotation) for annotation in self.annotations])
+        self.assertEqual(self.titles, [])
+
+    def testOtherProject(self):
+        # The annotations of the previous project are removed before the
+        # identifiers of the other one, numbered from 0 as well, are read.
+        others = fakeAnnotations(10, random.Random(1))
+        self.read(others)
+        self.index.flush()
+        self.assertTrue(self.index.assignIdentifiers(list(range(len(others)))))
+        self.assertEqual(self.listener.replaced, [])
+        self.assertEqual(list(self.index), others)
+        self.assertTrue(all(annotation not in self.index for annotation in self.annotations))
+        self.assertEqual([self.index.annotationByIdentifier(identifier) for identifier in range(len(others))], others)
+        self.assertEqual([self.index.title(annotation) for annotation in others], [fakeTitle(annotation) for annotation in others])
+        self.assertEqual(self.titles, others)
+
+    def testMismatchedIdentifiers(self):
+        identifiers = self.index.identifiers()
+        for mismatched in (identifiers[:-1], identifiers+[len(identifiers)], identifiers[:-1]+identifiers[:1]):
+            self.assertFalse(self.index.assignIdentifiers(mismatched))
+            self.assertEqual(self.index.identifiers(), identifiers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+
+# AnnotationManager: Dock similar to the layer manager that enables to individually show or hide text annotation.
+# Author: Jérémy Kalsron
+#         jeremy.kalsron@gmail.com
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from qgis.PyQt.QtCore import Qt, QAbstractItemModel, QModelIndex
+
+from collections import defaultdict
+
+from .core import contiguousRanges
+from .model import tr
+
+# Number of annotations materialized at once in a layer group.
+CHUNK = 500
+
+TYPES = ['QgsTextAnnotation', 'QgsSvgAnnotation', 'QgsHtmlAnnotation', 'QgsFormAnnotation']
+
+class AnnotationGroup:
+
+    # Type groups hold layer groups in children, layer groups hold their
+    # annotations, of which only the first fetched ones are exposed as rows.
+    def __init__(self, parent, key, title):
+        self.parent = parent
+        self.key = key
+        self.title = title
+        self.children = []
+        self.annotations = []
+        self.fetched = 0
+        self.visibleCount = None
+
+    def isLayerGroup(self):
+        return self.parent is not None and self.parent.parent is not None
+
+    def row(self):
+        return self.parent.children.index(self)
+
+    def child(self, key):
+        for child in self.children:
+            if child.key == key:
+                return child
+        return None
+
+    def members(self):
+        if self.isLayerGroup():
+            return self.annotations
+        return [annotation for child in self.children for annotation in child.annotations]
+
+    def size(self):
+        if self.isLayerGroup():
+            return len(self.annotations)
+        return sum(len(child.annotations) for child in self.children)
+
+def typeKey(annotation):
+    className = annotation.metaObject().className()
+    return className if className in TYPES else None
+
+def typeTitle(key):
+    return {
+        'QgsTextAnnotation': tr('Text annotations'),
+        'QgsSvgAnnotation': tr('SVG annotations'),
+        'QgsHtmlAnnotation': tr('HTML annotations'),
+        'QgsFormAnnotation': tr('Form annotations'),
+    }.get(key, tr('Other annotations'))
+
+def layerKey(annotation):
+    layer = annotation.mapLayer()
+    if layer is None:
+        return None, tr('No layer')
+    return layer.id(), layer.name()
+
+class AnnotationTreeModel(QAbstractItemModel):
+
+    # Every index points to the group holding its item: the root for the
+    # type groups, a type group for the layer groups and a layer group for
+    # the annotations.
+    def __init__(self, annotationIndex, parent=None):
+        super().__init__(parent)
+        self.annotationIndex = annotationIndex
+        self.removing = []
+        self.rebuild()
+        self.annotationIndex.listeners.append(self)
+
+    def rebuild(self):
+        self.root = AnnotationGroup(None, None, '')
+        self.groups = {}
+        # Keeps removed groups alive as long as views may hold indexes
+        # pointing to them.
+        self.retired = []
+        for annotation in self.annotationIndex.annotations():
+            group = self.layerGroup(annotation, notify=False)
+            group.annotations.append(annotation)
+            self.groups[annotation] = group
+        self.root.children.sort(key=lambda group: TYPES.index(group.key) if group.key in TYPES else len(TYPES))
+
+    def layerGroup(self, annotation, notify=True):
+        key = typeKey(annotation)
+        typeGroup = self.root.child(key)
+        if typeGroup is None:
+            typeGroup = self.appendGroup(self.root, AnnotationGroup(self.root, key, typeTitle(key)), notify)
+        key, title = layerKey(annotation)
+        group = typeGroup.child(key)
+        if group is None:
+            group = self.appendGroup(typeGroup, AnnotationGroup(typeGroup, key, title), notify)
+        return group
+
+    def appendGroup(self, parent, group, notify):
+        row = len(parent.children)
+        if notify:
+            self.beginInsertRows(self.groupIndex(parent), row, row)
+        parent.children.append(group)
+        if notify:
+            self.endInsertRows()
+        return group
+
+    def groupIndex(self, group):
+        if group is self.root:
+            return QModelIndex()
+        return self.createIndex(group.row(), 0, group.parent)
+
+    def group(self, index):
+        if not index.isValid():
+            return self.root
+        parent = index.internalPointer()
+        if parent.isLayerGroup():
+            return None
+        return parent.children[index.row()]
+
+    def annotation(self, index):
+        if not index.isValid():
+            return None
+        parent = index.internalPointer()
+        if not parent.isLayerGroup():
+            return None
+        annotation = parent.annotations[index.row()]
+        if annotation in self.annotationIndex.pendingRemovals:
+            return None
+        return annotation
+
+    def visible(self, group):
+        if group.visibleCount is None:
+            pending = self.annotationIndex.pendingRemovals
+            group.visibleCount = sum(1 for annotation in group.members() if annotation not in pending and annotation.isVisible())
+        return group.visibleCount
+
+    def annotations(self, indexes):
+        annotations = {}
+        for index in indexes:
+            group = self.group(index)
+            if group is None:
+                annotation = self.annotation(index)
+                if annotation is not None:
+                    annotations[annotation] = None
+            else:
+                pending = self.annotationIndex.pendingRemovals
+                annotations.update(dict.fromkeys(annotation for annotation in group.members() if annotation not in pending))
+        return list(annotations)
+
+    def index(self, row, column, parent=QModelIndex()):
+        group = self.group(parent)
+        if group is None or column != 0 or row < 0 or row >= self.rowCount(parent):
+            return QModelIndex()
+        return self.createIndex(row, column, group)
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.groupIndex(index.internalPointer())
+
+    def rowCount(self, parent=QModelIndex()):
+        group = self.group(parent)
+        if group is None:
+            return 0
+        if group.isLayerGroup():
+            return group.fetched
+        return len(group.children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QModelIndex()):
+        group = self.group(parent)
+        if group is None:
+            return False
+        return bool(group.annotations) if group.isLayerGroup() else bool(group.children)
+
+    def canFetchMore(self, parent):
+        group = self.group(parent)
+        return group is not None and group.isLayerGroup() and group.fetched < len(group.annotations)
+
+    def fetchMore(self, parent):
+        group = self.group(parent)
+        count = min(CHUNK, len(group.annotations)-group.fetched)
+        if count > 0:
+            self.beginInsertRows(parent, group.fetched, group.fetched+count-1)
+            group.fetched += count
+            self.endInsertRows()
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        group = self.group(index)
+        if group is not None:
+            if role == Qt.DisplayRole:
+                return '{} ({})'.format(group.title, group.size())
+            if role == Qt.CheckStateRole:
+                visible = self.visible(group)
+                if visible == 0:
+                    return Qt.Unchecked
+                return Qt.Checked if visible == group.size() else Qt.PartiallyChecked
+            return None
+        annotation = self.annotation(index)
+        if annotation is None:
+            return None
+        if role == Qt.DisplayRole:
+            title = self.annotationIndex.cachedTitle(annotation)
+            return tr('Loading...') if title is None else title
+        if role == Qt.ToolTipRole:
+            return self.annotationIndex.cachedSnippet(annotation) or None
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if annotation.isVisible() else Qt.Unchecked
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        group = self.group(index)
+        annotations = self.annotations([index]) if group is None else group.members()
+        self.annotationIndex.setVisibility(annotations, value != Qt.Unchecked)
+        return True
+
+    def invalidate(self, group):
+        group.visibleCount = None
+        group.parent.visibleCount = None
+        self.dataChanged.emit(self.groupIndex(group.parent), self.groupIndex(group.parent), [Qt.DisplayRole, Qt.CheckStateRole])
+        self.dataChanged.emit(self.groupIndex(group), self.groupIndex(group), [Qt.DisplayRole, Qt.CheckStateRole])
+        if group.fetched:
+            parent = self.groupIndex(group)
+            self.dataChanged.emit(self.index(0, 0, parent), self.index(group.fetched-1, 0, parent))
+
+    def addAnnotations(self, annotations):
+        added = defaultdict(list)
+        for annotation in annotations:
+            group = self.groups[annotation] = self.layerGroup(annotation)
+            added[group].append(annotation)
+        for group, annotations in added.items():
+            complete = group.fetched == len(group.annotations)
+            group.annotations.extend(annotations)
+            count = min(len(annotations), CHUNK-group.fetched)
+            if complete and count > 0:
+                self.beginInsertRows(self.groupIndex(group), group.fetched, group.fetched+count-1)
+                group.fetched += count
+                self.endInsertRows()
+            self.invalidate(group)
+
+    def removeAnnotations(self, annotations):
+        removed = defaultdict(set)
+        for annotation in annotations:
+            group = self.groups.pop(annotation, None)
+            if group is not None:
+                removed[group].add(annotation)
+        for group, annotations in removed.items():
+            rows = [row for row in range(group.fetched) if group.annotations[row] in annotations]
+            ranges = contiguousRanges(rows)
+            if len(ranges) > 32:
+                self.beginResetModel()
+                self.rebuild()
+                self.endResetModel()
+                return
+            parent = self.groupIndex(group)
+            for start, end in reversed(ranges):
+                self.beginRemoveRows(parent, start, end)
+                del group.annotations[start:end+1]
+                group.fetched -= end-start+1
+                self.endRemoveRows()
+            group.annotations = group.annotations[:group.fetched]+[annotation for annotation in group.annotations[group.fetched:] if annotation not in annotations]
+            if group.annotations:
+                self.invalidate(group)
+            else:
+                self.removeGroup(group)
+
+    def removeGroup(self, group):
+        parent = group.parent
+        self.beginRemoveRows(self.groupIndex(parent), group.row(), group.row())
+        parent.children.remove(group)
+        self.retired.append(group)
+        self.endRemoveRows()
+        if parent is not self.root:
+            if parent.children:
+                parent.visibleCount = None
+                self.dataChanged.emit(self.groupIndex(parent), self.groupIndex(parent), [Qt.DisplayRole, Qt.CheckStateRole])
+            else:
+                self.removeGroup(parent)
+
+    def indexRowsAboutToBeInserted(self, start, end):
+        pass
+
+    def indexRowsInserted(self, start, end):
+        self.addAnnotations(self.annotationIndex.order[start:end+1])
+
+    def indexRowsAboutToBeRemoved(self, start, end):
+        self.removing.extend(self.annotationIndex.order[start:end+1])
+
+    def indexRowsRemoved(self, start, end):
+        removing, self.removing = self.removing, []
+        self.removeAnnotations(removing)
+
+    def indexAboutToBeReset(self):
+        self.beginResetModel()
+
+    def indexReset(self):
+        self.rebuild()
+        self.endResetModel()
+
+    def indexRowsChanged(self, first, last, titleChanged):
+        groups = {self.groups[annotation] for annotation in self.annotationIndex.order[first:last+1] if annotation in self.groups}
+        for group in groups:
+            self.invalidate(group)
+
+    def indexTitlesChanged(self, first, last):
+        # Unlike indexRowsChanged the visibility counts are still valid.
+        groups = {self.groups[annotation] for annotation in self.annotationIndex.order[first:last+1] if annotation in self.groups}
+        for group in groups:
+            if group.fetched:
+                parent = self.groupIndex(group)
+                self.dataChanged.emit(self.index(0, 0, parent), self.index(group.fetched-1, 0, parent), [Qt.DisplayRole, Qt.ToolTipRole])
+
+    def indexVisibilityChosen(self, annotations, visible):
+        pass
+
+    def indexAnnotationsReplaced(self, replaced):
+        # The new annotation takes the row of the old one when they belong to
+        # the same group, it is moved otherwise.
+        rows = {}
+        changed = set()
+        moved = []
+        for old, new in replaced:
+            group = self.groups.pop(old, None)
+            if group is None:
+                continue
+            if typeKey(new) != group.parent.key or layerKey(new)[0] != group.key:
+                self.groups[old] = group
+                moved.append((old, new))
+                continue
+            if group not in rows:
+                rows[group] = {annotation: row for row, annotation in enumerate(group.annotations)}
+            group.annotations[rows[group][old]] = new
+            self.groups[new] = group
+            changed.add(group)
+        for group in changed:
+            self.invalidate(group)
+        if moved:
+            self.removeAnnotations([old for old, new in moved])
+            self.addAnnotations([new for old, new in moved])
+
+    def indexTextChanged(self):
+        pass
+
+    def indexPositionsChanged(self):
+        pass
+
+    def unload(self):
+        self.annotationIndex.listeners.remove(self)